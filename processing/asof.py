@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from player_matrix import load_player_matrix, team_match_incidence
+from team_matches import load_team_matches
+
+# additieve stats met een prefix-som per speeldag
+PLAYER_ASOF_STATS = (
+    "selected", "started", "sub_in", "sub_out", "minutes", "goals", "penalties",
+    "own_goals", "yellow", "yellow_red", "red", "clean_sheet", "captain",
+)
+TEAM_ASOF_STATS = (
+    "played", "wins", "draws", "losses", "points", "goals_for", "goals_against",
+)
+
+
+# -------------------------------------------------
+# "As of"-index: cumulatieve sommen per speeldag
+# -------------------------------------------------
+# Speeldag N = speeldag uit de kalender (zie team_matches.fixture_matchdays, zoals
+# standings_history.json). Elke reeks is een matrix met een nulkolom vooraan:
+#   C[:, 0] = 0,  C[:, N] = som over speeldag 1..N
+# zodat de som over speeldag a..b gelijk is aan C[:, b] - C[:, a - 1].
+# Ploegen/spelers zonder match op een speeldag houden hun vorige stand.
+
+
+def _cumulative(row_idx, round_idx, values, n_rows, n_rounds) -> np.ndarray:
+    m = np.zeros((n_rows, n_rounds + 1))
+    np.add.at(m, (row_idx, round_idx + 1), values)
+    return np.cumsum(m, axis=1)
+
+
+def build_team_asof(tm: pd.DataFrame) -> dict:
+    """
+    Prefix-sommen per ploeg uit team_matches (zie team_matches.build_team_matches).
+    "dates" = laatste speeldatum van elke speeldag (voor een datumslider),
+    "matches" = (team, date, matchday) per gespeelde match.
+    """
+    teams = sorted(tm["team"].unique())
+    n_rounds = int(tm["matchday"].max()) if len(tm) else 0
+    t_idx = pd.Index(teams).get_indexer(tm["team"])
+    r_idx = tm["matchday"].to_numpy(dtype=int) - 1
+    date = pd.to_datetime(tm["date"]).to_numpy().astype("datetime64[ns]")
+
+    values = {
+        "played": np.ones(len(tm)),
+        "wins": (tm["result"] == 1.0).to_numpy(dtype=float),
+        "draws": (tm["result"] == 0.5).to_numpy(dtype=float),
+        "losses": (tm["result"] == 0.0).to_numpy(dtype=float),
+        "points": tm["points"].to_numpy(dtype=float),
+        "goals_for": tm["goals_for"].to_numpy(dtype=float),
+        "goals_against": tm["goals_against"].to_numpy(dtype=float),
+    }
+
+    dates = pd.Series(date).groupby(r_idx).max().reindex(range(n_rounds)).to_numpy()
+
+    return {
+        "teams": teams,
+        "n_rounds": n_rounds,
+        "dates": dates,
+        "matches": pd.DataFrame({"team": tm["team"].to_numpy(), "date": date, "round": r_idx}),
+        "C": {s: _cumulative(t_idx, r_idx, values[s], len(teams), n_rounds) for s in TEAM_ASOF_STATS},
+    }
+
+
+def build_player_asof(pmx: dict, team_idx: dict) -> dict:
+    """
+    Prefix-sommen per (ploeg, speler) op de speeldagen van de eigen ploeg.
+    Matchen uit player_matchdata worden via (ploeg, datum) aan de speeldag uit
+    team_idx gekoppeld; matchen zonder gespeelde fixture vallen weg.
+    """
+    teams = pmx["teams"]
+    player_team = pmx["player_team"]
+    n_rounds = team_idx["n_rounds"]
+
+    # (ploeg, matchkolom) -> speeldag
+    T = team_match_incidence(pmx).tocoo()
+    inc = pd.DataFrame({
+        "team": np.asarray(teams, dtype=object)[T.row],
+        "col": T.col,
+        "date": pmx["matches"]["date"].to_numpy().astype("datetime64[ns]")[T.col],
+    })
+    inc = inc.merge(team_idx["matches"], on=["team", "date"], how="inner")
+
+    # per nnz van de spelersmatrix de speeldag opzoeken (sleutel = ploeg * n_cols + kolom)
+    n_cols = len(pmx["matches"])
+    team_code = pd.Index(teams).get_indexer(inc["team"])
+    keys = team_code.astype(np.int64) * n_cols + inc["col"].to_numpy()
+    key_order = np.argsort(keys)
+    keys, key_round = keys[key_order], inc["round"].to_numpy()[key_order]
+
+    C = {}
+    for s in PLAYER_ASOF_STATS:
+        M = pmx["M"][s].tocoo()
+        k = player_team[M.row].astype(np.int64) * n_cols + M.col
+        pos = np.searchsorted(keys, k).clip(max=max(len(keys) - 1, 0))
+        hit = keys[pos] == k if len(keys) else np.zeros(len(k), dtype=bool)
+        C[s] = _cumulative(M.row[hit], key_round[pos[hit]], M.data[hit], len(player_team), n_rounds)
+
+    return {
+        "players": pmx["players"],
+        "player_team": player_team,
+        "teams": teams,
+        "n_rounds": n_rounds,
+        "C": C,
+    }
+
+
+def build_asof_index() -> dict:
+    """Volledige as-of index (ploegen + spelers) uit de tussenbestanden van de pipeline."""
+    team_idx = build_team_asof(load_team_matches())
+    player_idx = build_player_asof(load_player_matrix(), team_idx)
+    return {"team": team_idx, "player": player_idx}
+
+
+def _window(idx: dict, round_a: int, round_b: int, stats) -> dict:
+    """Som over speeldag round_a..round_b (1-based, inclusief) in O(1) per rij."""
+    a = max(int(round_a), 1)
+    b = min(int(round_b), idx["n_rounds"])
+    if b < a:
+        return {s: np.zeros(len(idx["C"][s])) for s in stats}
+    return {s: idx["C"][s][:, b] - idx["C"][s][:, a - 1] for s in stats}
+
+
+def team_window(asof: dict, round_a: int, round_b: int) -> pd.DataFrame:
+    """Ploegstats tussen twee speeldagen (bv. 8–15), één rij per ploeg."""
+    idx = asof["team"]
+    w = _window(idx, round_a, round_b, TEAM_ASOF_STATS)
+    out = pd.DataFrame({"team": idx["teams"], **{s: w[s].astype(int) for s in TEAM_ASOF_STATS}})
+    out["goal_diff"] = out["goals_for"] - out["goals_against"]
+    return out
+
+
+def player_window(asof: dict, round_a: int, round_b: int) -> pd.DataFrame:
+    """Spelerstats tussen twee speeldagen van de eigen ploeg, één rij per (ploeg, speler)."""
+    idx = asof["player"]
+    w = _window(idx, round_a, round_b, PLAYER_ASOF_STATS)
+    out = idx["players"][["player_id", "Team", "Player Name"]].reset_index(drop=True)
+    for s in PLAYER_ASOF_STATS:
+        out[s] = w[s].astype(int)
+    return out
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from build_data_team import CALENDAR_JSON, load_season
+from elo_engine import G_FACTORS, index_teams, match_outcomes, run_elo
+
+# ---- CONFIG ----
+SEASONS = [CALENDAR_JSON, "data_raw/data_team_prev.csv"]
+
+GRID_K = [10, 15, 20, 25, 30, 35, 40, 50, 60]
+GRID_HOME_ADV = [0, 25, 50, 75, 100]
+GRID_G = list(G_FACTORS)
+
+INITIAL_ELO = 1500   # verschuift alle ratings gelijk → geen invloed op voorspellingen
+WARMUP = 0           # eerste N gespeelde matchen per seizoen niet meetellen
+N_BUCKETS = 10       # calibratie-buckets op expected_home
+
+REPORT_PATH = "data_raw/elo_backtest.csv"
+CALIBRATION_PATH = "data_raw/elo_backtest_calibration.json"
+
+
+# -------------------------------------------------
+# Scoring
+# -------------------------------------------------
+def score_predictions(p, s, n_buckets: int = N_BUCKETS) -> dict:
+    """
+    p = voorspelde expected_home, s = werkelijk resultaat (1 / 0.5 / 0).
+    Log-loss en Brier op de ELO-score (gelijkspel = 0.5), plus calibratie-buckets.
+    """
+    p = np.clip(np.asarray(p, dtype=float), 1e-12, 1 - 1e-12)
+    s = np.asarray(s, dtype=float)
+
+    logloss = float(np.mean(-(s * np.log(p) + (1 - s) * np.log(1 - p))))
+    brier = float(np.mean((p - s) ** 2))
+
+    bucket = np.minimum((p * n_buckets).astype(int), n_buckets - 1)
+    count = np.bincount(bucket, minlength=n_buckets)
+    sum_p = np.bincount(bucket, weights=p, minlength=n_buckets)
+    sum_s = np.bincount(bucket, weights=s, minlength=n_buckets)
+    nz = count > 0
+    mean_p = np.divide(sum_p, count, out=np.zeros(n_buckets), where=nz)
+    mean_s = np.divide(sum_s, count, out=np.zeros(n_buckets), where=nz)
+    ece = float(np.sum(count * np.abs(mean_p - mean_s)) / max(len(p), 1))
+
+    buckets = [
+        {
+            "from": b / n_buckets,
+            "to": (b + 1) / n_buckets,
+            "count": int(count[b]),
+            "meanPred": round(float(mean_p[b]), 4),
+            "meanResult": round(float(mean_s[b]), 4),
+        }
+        for b in range(n_buckets) if nz[b]
+    ]
+    return {"n": int(len(p)), "logloss": logloss, "brier": brier, "ece": ece, "buckets": buckets}
+
+
+# -------------------------------------------------
+# Eén grid-punt: (seizoen, home-advantage, G-variant) × alle K's
+# -------------------------------------------------
+def _season_arrays(path: str) -> dict:
+    df = load_season(path)
+    teams, home_idx, away_idx = index_teams(df["homeTeam"], df["awayTeam"])
+    return {
+        "season": str(path),
+        "n_teams": len(teams),
+        "home_idx": home_idx,
+        "away_idx": away_idx,
+        "home_score": pd.to_numeric(df["homeScore"], errors="coerce").to_numpy(dtype=float),
+        "away_score": pd.to_numeric(df["awayScore"], errors="coerce").to_numpy(dtype=float),
+    }
+
+
+def _evaluate(task) -> list[dict]:
+    season, home_adv, g_name, ks = task
+
+    played, result_home, G = match_outcomes(
+        season["home_score"], season["away_score"], g_func=G_FACTORS[g_name]
+    )
+    run = run_elo(
+        season["home_idx"], season["away_idx"], result_home, G, season["n_teams"],
+        k=ks, initial_elo=INITIAL_ELO, home_adv=home_adv,
+    )
+
+    rows = np.flatnonzero(played)[WARMUP:]
+    out = []
+    for j, k in enumerate(ks):
+        sc = score_predictions(run["expected_home"][rows, j], result_home[rows])
+        out.append({"season": season["season"], "K": k, "home_adv": home_adv, "G": g_name, **sc})
+    return out
+
+
+def run_backtest(seasons=SEASONS, ks=GRID_K, home_advs=GRID_HOME_ADV, g_names=GRID_G, workers=None):
+    """Evalueer het volledige grid parallel; returnt (ranking-DataFrame, ruwe scores)."""
+    season_data = [_season_arrays(p) for p in seasons if os.path.exists(p)]
+    if not season_data:
+        raise FileNotFoundError(f"Geen seizoensbestanden gevonden: {seasons}")
+
+    tasks = [
+        (s, ha, g, list(ks))
+        for s, ha, g in itertools.product(season_data, home_advs, g_names)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        scores = [row for chunk in ex.map(_evaluate, tasks) for row in chunk]
+
+    per_season = pd.DataFrame([{k: v for k, v in r.items() if k != "buckets"} for r in scores])
+
+    # over alle seizoenen: gewogen naar aantal matchen
+    keys = ["K", "home_adv", "G"]
+    per_season["ll_w"] = per_season["logloss"] * per_season["n"]
+    per_season["br_w"] = per_season["brier"] * per_season["n"]
+    per_season["ece_w"] = per_season["ece"] * per_season["n"]
+    agg = per_season.groupby(keys, as_index=False).agg(
+        n=("n", "sum"), ll_w=("ll_w", "sum"), br_w=("br_w", "sum"), ece_w=("ece_w", "sum"),
+    )
+    agg["logloss"] = agg["ll_w"] / agg["n"]
+    agg["brier"] = agg["br_w"] / agg["n"]
+    agg["ece"] = agg["ece_w"] / agg["n"]
+
+    # log-loss per seizoen als extra kolommen
+    wide = per_season.pivot_table(index=keys, columns="season", values="logloss").reset_index()
+    wide.columns = [c if c in keys else f"logloss {os.path.basename(c)}" for c in wide.columns]
+
+    ranking = (
+        agg[keys + ["n", "logloss", "brier", "ece"]]
+        .merge(wide, on=keys, how="left")
+        .sort_values(["logloss", "brier"], kind="stable")
+        .reset_index(drop=True)
+    )
+    ranking.insert(0, "rank", ranking.index + 1)
+    return ranking, scores
+
+
+def _calibration(scores, K, home_adv, g_name) -> dict:
+    return {
+        r["season"]: r["buckets"]
+        for r in scores
+        if r["K"] == K and r["home_adv"] == home_adv and r["G"] == g_name
+    }
+
+
+def main():
+    ranking, scores = run_backtest()
+    ranking.round(5).to_csv(REPORT_PATH, index=False, encoding="utf8")
+
+    best = ranking.iloc[0]
+    calib = {
+        "best": {
+            "params": {"K": float(best["K"]), "home_adv": float(best["home_adv"]), "G": best["G"]},
+            "buckets": _calibration(scores, best["K"], best["home_adv"], best["G"]),
+        },
+        "current": {
+            "params": {"K": 30.0, "home_adv": 0.0, "G": "sheet"},
+            "buckets": _calibration(scores, 30, 0, "sheet"),
+        },
+    }
+    with open(CALIBRATION_PATH, "w", encoding="utf8") as f:
+        json.dump(calib, f, ensure_ascii=False, indent=2)
+
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cur = ranking[(ranking["K"] == 30) & (ranking["home_adv"] == 0) & (ranking["G"] == "sheet")]
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(ranking.head(top).round(4).to_string(index=False))
+        if not cur.empty:
+            print("\nHuidige instelling (K=30, home_adv=0, G=sheet):")
+            print(cur.round(4).to_string(index=False))
+    print(f"\nSaved: {REPORT_PATH}, {CALIBRATION_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,67 @@
+import sys
+
 import pandas as pd
 import numpy as np
 
+from events import GOAL_CODES, event_codes
+
 INPUT_PATH = "data_raw/match_events.csv"
 OUTPUT_PATH = "data_raw/data_matchevent.csv"
 
-GOAL_EVENTS = {"Goal", "Penalty", "Own Goal"}
+# streaming-modus (--stream): zoveel events per chunk inlezen en wegschrijven
+CHUNK_SIZE = 50_000
 
 
-def build_data_matchevent():
-    # 1) Inladen ruwe events
-    df = pd.read_csv(INPUT_PATH)
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Afgeleide kolommen, kolomgewijs (geen rij-per-rij apply)."""
+    # is_home: 1 / True = thuisploeg
+    is_home = df["is_home"].eq(1).to_numpy()
 
     # 2) team against
-    def team_against(row):
-        val = row["is_home"]
-        is_home = (val == 1) or (val is True)
-        return row["away_team"] if is_home else row["home_team"]
+    df["team against"] = np.where(is_home, df["away_team"], df["home_team"])
 
-    df["team against"] = df.apply(team_against, axis=1)
+    # 3) Goal total event (1 bij Goal / Penalty / Own Goal, via de event-codes)
+    is_goal = np.isin(event_codes(df["event"]), GOAL_CODES)
+    df["Goal total event"] = is_goal.astype(int)
 
-    # 3) Goal total event (1 bij Goal / Penalty / Own Goal)
-    df["Goal total event"] = df["event"].isin(GOAL_EVENTS).astype(int)
+    # 4) Goal new diff: goals van het scorende team - tegengoals (enkel bij goals)
+    home_g = df["home_team_goals"].to_numpy()
+    away_g = df["away_team_goals"].to_numpy()
+    diff = np.where(is_home, home_g - away_g, away_g - home_g)
+    df["Goal new diff"] = np.where(is_goal, diff, np.nan)
 
-    # 4) Goal new diff: goals van het scorende team - tegengoals
-    def goal_new_diff(row):
-        if row["Goal total event"] != 1:
-            return np.nan
+    return df
 
-        val = row["is_home"]
-        is_home = (val == 1) or (val is True)
 
-        home_g = row["home_team_goals"]
-        away_g = row["away_team_goals"]
-
-        if is_home:
-            return home_g - away_g
-        else:
-            return away_g - home_g
+def build_data_matchevent(chunksize: int | None = None):
+    """
+    Zonder chunksize: volledige event-log in één keer (zoals vroeger).
+    Met chunksize: match_events.csv in blokken lezen en telkens aan
+    data_matchevent.csv toevoegen (header enkel bij het eerste blok),
+    zodat het geheugengebruik begrensd blijft bij grote event-logs.
+    """
+    # 1) Inladen ruwe events
+    if chunksize is None:
+        df = add_derived_columns(pd.read_csv(INPUT_PATH))
 
-    df["Goal new diff"] = df.apply(goal_new_diff, axis=1)
+        # 5) CSV wegschrijven (zoals vroeger)
+        df.to_csv(OUTPUT_PATH, index=False, encoding="utf8")
+        print(f"Saved: {OUTPUT_PATH}")
+        return
 
-    # 5) CSV wegschrijven (zoals vroeger)
-    df.to_csv(OUTPUT_PATH, index=False, encoding="utf8")
-    print(f"Saved: {OUTPUT_PATH}")
+    n_rows = 0
+    with pd.read_csv(INPUT_PATH, chunksize=chunksize) as reader:
+        for i, chunk in enumerate(reader):
+            add_derived_columns(chunk).to_csv(
+                OUTPUT_PATH,
+                mode="w" if i == 0 else "a",
+                header=(i == 0),
+                index=False,
+                encoding="utf8",
+            )
+            n_rows += len(chunk)
+    print(f"Saved: {OUTPUT_PATH} ({n_rows} events, chunks van {chunksize})")
 
 
 if __name__ == "__main__":
-    build_data_matchevent()
+    build_data_matchevent(CHUNK_SIZE if "--stream" in sys.argv[1:] else None)
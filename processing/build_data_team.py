@@ -1,145 +1,225 @@
 import pandas as pd
+import numpy as np
 import json
+import hashlib
+import sys
+from pathlib import Path
+
+from dutch_dates import CALENDAR_JSON, load_calendar_table
+from elo_engine import chain_seasons, index_teams, match_outcomes, run_elo, seed_ratings
 
 # ---- CONFIG ----
 INITIAL_ELO = 1500
 K = 30  # standaard 30 zoals in je sheet
 
+# Vorige seizoenen (oudste eerst) waarvan de eindstand wordt meegenomen.
+# Standaard leeg = elk seizoen start iedereen op INITIAL_ELO (zoals de sheet).
+# Opt-in via --chain (gebruikt CHAIN_SEASONS). Shrink en promovendi-rating zijn
+# nog niet getuned: backtest_elo start elk seizoen op INITIAL_ELO.
+PREV_SEASONS: list[str] = []
+CHAIN_SEASONS = ["data_raw/data_team_prev.csv"]
+CARRYOVER_SHRINK = 0.33   # deel van de afstand tot het gemiddelde dat wegvalt tussen seizoenen
+NEW_TEAM_ELO = 1450       # startrating voor gepromoveerde / nieuwe ploegen
+
+OUTPUT_PATH = "data_raw/data_team.csv"
+CHECKPOINT_PATH = "data_raw/elo_checkpoint.json"  # ratings na laatste gespeelde match
+
+
+def load_matches(path: str = CALENDAR_JSON):
+    """Laad kalender uit JSON en zet datum naar datetime."""
+    df = load_calendar_table(path)
+    df = df.sort_values("date").reset_index(drop=True)
+    return df
+
+def load_season(path: str) -> pd.DataFrame:
+    """
+    Laad één seizoen als fixture-tabel (date, homeTeam, awayTeam, homeScore, awayScore).
+    Werkt voor een kalender-JSON (scraper) én voor een data_team-achtige CSV
+    zoals data_team_prev.csv (datum als dd/mm/yyyy).
+    """
+    if str(path).endswith(".json"):
+        return load_matches(path)
+
+    cols = ["url", "date", "homeTeam", "awayTeam", "homeScore", "awayScore"]
+    df = pd.read_csv(path, usecols=lambda c: c in cols)
+    df["date"] = pd.to_datetime(df["date"], format="%d/%m/%Y", errors="coerce")
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+def _round_list(values, ndigits):
+    """Python-round per waarde (identiek aan de vroegere rij-per-rij output)."""
+    return [round(v, ndigits) for v in values.tolist()]
+
+
+def elo_rows(df, run, result_home, G, param: int = 0) -> pd.DataFrame:
+    """Zet de arrays van run_elo (parameter-set `param`) om naar de data_team.csv rijen."""
+    return pd.DataFrame({
+        "date": df["date"].dt.strftime("%d/%m/%Y").to_numpy(),
+        "homeTeam": df["homeTeam"].to_numpy(),
+        "awayTeam": df["awayTeam"].to_numpy(),
+        "homeScore": df["homeScore"].to_numpy(),
+        "awayScore": df["awayScore"].to_numpy(),
+        "elo_home_before": _round_list(run["elo_home_before"][:, param], 2),
+        "elo_away_before": _round_list(run["elo_away_before"][:, param], 2),
+        "expected_home": _round_list(run["expected_home"][:, param], 4),
+        "expected_away": _round_list(run["expected_away"][:, param], 4),
+        "result_home": result_home,
+        "result_away": 1 - result_home,
+        "G": G,
+        "elo_home_after": _round_list(run["elo_home_after"][:, param], 2),
+        "elo_away_after": _round_list(run["elo_away_after"][:, param], 2),
+    })
+
+
 # -------------------------------------------------
-# 🇳🇱 Nederlandse maanden → maandnummer
+# Checkpoint: ratings + fingerprint van verwerkte fixtures
 # -------------------------------------------------
-MONTH_MAP_NL = {
-    "JANUARI": 1,
-    "FEBRUARI": 2,
-    "MAART": 3,
-    "APRIL": 4,
-    "MEI": 5,
-    "JUNI": 6,
-    "JULI": 7,
-    "AUGUSTUS": 8,
-    "SEPTEMBER": 9,
-    "OKTOBER": 10,
-    "NOVEMBER": 11,
-    "DECEMBER": 12,
-}
-
-def parse_dutch_date(s: str) -> pd.Timestamp:
+def fixture_fingerprints(df) -> list[str]:
+    """Korte hash per kalenderrij (url, datum, ploegen, score)."""
+    def txt(col):
+        if col not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[col].astype(object).fillna("").astype(str)
+
+    keys = (
+        txt("url") + "|" + df["date"].dt.strftime("%Y-%m-%d") + "|"
+        + txt("homeTeam") + "|" + txt("awayTeam") + "|"
+        + txt("homeScore") + "|" + txt("awayScore")
+    )
+    return [hashlib.sha1(k.encode("utf8")).hexdigest()[:16] for k in keys]
+
+
+def load_checkpoint(path: str = CHECKPOINT_PATH):
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def season_seed(teams, paths=PREV_SEASONS):
     """
-    Converteer datum zoals:
-    'ZATERDAG, 30 AUGUSTUS 2025'
-    naar een echte datetime.
+    Startratings voor het huidige seizoen door de vorige seizoenen in één
+    streaming pass af te lopen (telkens één seizoen in geheugen).
+    None als er geen vorige seizoenen zijn.
     """
-    s = s.strip()
-    # verwijder dag + komma
-    if "," in s:
-        s = s.split(",", 1)[1].strip()
+    paths = [p for p in paths if Path(p).exists()]
+    if not paths:
+        return None
 
-    # s = "30 AUGUSTUS 2025"
-    parts = s.split()
-    day = int(parts[0])
-    month = MONTH_MAP_NL[parts[1].upper()]
-    year = int(parts[2])
+    last = None
+    for _, season_teams, _, _, _, run in chain_seasons(
+        (load_season(p) for p in paths),
+        k=K, initial_elo=INITIAL_ELO,
+        shrink=CARRYOVER_SHRINK, new_team_elo=NEW_TEAM_ELO,
+    ):
+        last = (season_teams, run["ratings"])
 
-    return pd.Timestamp(year=year, month=month, day=day)
+    return seed_ratings(last[0], last[1], teams, CARRYOVER_SHRINK, NEW_TEAM_ELO)
 
-def expected_score(elo_team, elo_opponent):
-    """Bereken verwacht resultaat via de ELO-formule."""
-    return 1 / (1 + 10 ** ((elo_opponent - elo_team) / 400))
 
-def load_matches():
-    """Laad kalender uit JSON en zet datum naar datetime."""
-    with open("data_raw/match_calendar.json", "r", encoding="utf8") as f:
-        matches = json.load(f)
+def _params(seed) -> dict:
+    """Alles wat de ratings beïnvloedt; bij verschil → volledige rebuild."""
+    return {
+        "K": K,
+        "INITIAL_ELO": INITIAL_ELO,
+        "seed": None if seed is None else [round(float(r), 6) for r in seed[0]],
+    }
+
+
+def save_checkpoint(teams, ratings, fingerprints, n_done, params, path: str = CHECKPOINT_PATH):
+    cp = {
+        "params": params,
+        "n_done": int(n_done),
+        "fixtures": fingerprints,
+        "ratings": {t: float(r) for t, r in zip(teams, ratings)},
+    }
+    Path(path).write_text(json.dumps(cp, ensure_ascii=False), encoding="utf8")
 
-    df = pd.DataFrame(matches)
-    df["date"] = df["date"].apply(parse_dutch_date)
-    df = df.sort_values("date").reset_index(drop=True)
-    return df
 
-def process():
+def _resume_index(cp, teams, fingerprints, params):
+    """
+    Vanaf welke rij kunnen we verder rekenen met de checkpoint-ratings?
+    None = volledige rebuild nodig (andere params/ploegen of een eerder
+    resultaat is gewijzigd).
+    """
+    if not cp or cp.get("params") != params:
+        return None
+    if sorted(cp.get("ratings", {})) != teams:
+        return None
+
+    n_done = int(cp.get("n_done", 0))
+    old = cp.get("fixtures", [])
+    if n_done > len(fingerprints) or old[:n_done] != fingerprints[:n_done]:
+        return None
+
+    # bestaande CSV moet exact de vorige run bevatten
+    try:
+        with open(OUTPUT_PATH, "r", encoding="utf8") as f:
+            n_rows = sum(1 for _ in f) - 1
+    except FileNotFoundError:
+        return None
+    if n_rows != len(old):
+        return None
+    return n_done
+
+
+def process(full: bool = False, prev_seasons=None):
+    """
+    prev_seasons: vorige seizoenen om de startratings uit af te leiden
+    (None = PREV_SEASONS, dus standaard geen chaining).
+    """
     df = load_matches()
-    
-    # lijst van alle ploegen
-    teams = sorted(set(df["homeTeam"]).union(df["awayTeam"]))
-
-    # init ELO dictionary
-    elo = {team: INITIAL_ELO for team in teams}
-
-    results = []
-
-    for _, row in df.iterrows():
-        ht = row["homeTeam"]
-        at = row["awayTeam"]
-        hs = row["homeScore"]
-        as_ = row["awayScore"]
-
-        elo_home = elo[ht]
-        elo_away = elo[at]
-
-        # expected values
-        exp_home = expected_score(elo_home, elo_away)
-        exp_away = expected_score(elo_away, elo_home)
-
-        # resultaat
-        if pd.isna(hs):
-            # toekomstige match
-            result_home = None
-            result_away = None
-            G = 0
-        else:
-            hs = int(hs)
-            as_ = int(as_)
-
-            if hs > as_:
-                result_home = 1
-                result_away = 0
-            elif hs < as_:
-                result_home = 0
-                result_away = 1
-            else:
-                result_home = 0.5
-                result_away = 0.5
-
-            # G-factor precies zoals je in Excel gebruikt
-            diff = abs(hs - as_)
-            if diff <= 1:
-                G = 1
-            else:
-                G = (11 + diff) / 8
-
-        # nieuwe ELO
-        if result_home is not None:
-            new_elo_home = elo_home + K * G * (result_home - exp_home)
-            new_elo_away = elo_away + K * G * (result_away - exp_away)
-        else:
-            new_elo_home = elo_home
-            new_elo_away = elo_away
-
-        results.append({
-            "date": row["date"].strftime("%d/%m/%Y"),
-            "homeTeam": ht,
-            "awayTeam": at,
-            "homeScore": row["homeScore"],
-            "awayScore": row["awayScore"],
-            "elo_home_before": round(elo_home, 2),
-            "elo_away_before": round(elo_away, 2),
-            "expected_home": round(exp_home, 4),
-            "expected_away": round(exp_away, 4),
-            "result_home": result_home,
-            "result_away": result_away,
-            "G": G,
-            "elo_home_after": round(new_elo_home, 2),
-            "elo_away_after": round(new_elo_away, 2)
-        })
-
-        # update ELO’s
-        elo[ht] = new_elo_home
-        elo[at] = new_elo_away
-
-    out = pd.DataFrame(results)
-    out.to_csv("data_raw/data_team.csv", index=False, encoding="utf8")
-
-    print("Saved: data_raw/data_team.csv")
+
+    # ploegen -> integer index, resultaten + G-factor in één keer
+    teams, home_idx, away_idx = index_teams(df["homeTeam"], df["awayTeam"])
+    played, result_home, G = match_outcomes(df["homeScore"], df["awayScore"])
+    fingerprints = fixture_fingerprints(df)
+
+    # startratings uit vorige seizoenen (regressie naar het gemiddelde)
+    seed = season_seed(teams, PREV_SEASONS if prev_seasons is None else prev_seasons)
+    params = _params(seed)
+
+    cp = None if full else load_checkpoint()
+    start = _resume_index(cp, teams, fingerprints, params)
+
+    if start is not None and cp["fixtures"] == fingerprints:
+        print(f"Geen wijzigingen in kalender — {OUTPUT_PATH} blijft ongewijzigd")
+        return
+
+    if start is None:
+        # volledige rebuild
+        start = 0
+        ratings = seed
+    else:
+        ratings = np.array([[cp["ratings"][t] for t in teams]])
+
+    # enkel de rijen vanaf het checkpoint opnieuw afspelen
+    tail = slice(start, None)
+    run = run_elo(
+        home_idx[tail], away_idx[tail], result_home[tail], G[tail], len(teams),
+        k=K, initial_elo=INITIAL_ELO, ratings=ratings,
+    )
+    out = elo_rows(df.iloc[tail], run, result_home[tail], G[tail])
+
+    if start == 0:
+        out.to_csv(OUTPUT_PATH, index=False, encoding="utf8")
+    else:
+        # header + ongewijzigde rijen behouden, rest patchen/toevoegen
+        with open(OUTPUT_PATH, "r", encoding="utf8", newline="") as f:
+            keep = [line for _, line in zip(range(start + 1), f)]
+        with open(OUTPUT_PATH, "w", encoding="utf8", newline="") as f:
+            f.writelines(keep)
+            out.to_csv(f, index=False, header=False)
+
+    # checkpoint na de laatste gespeelde match
+    n_done = int(np.flatnonzero(played)[-1]) + 1 if played.any() else 0
+    save_checkpoint(teams, run["ratings"][0], fingerprints, n_done, params)
+
+    mode = "volledig" if start == 0 else f"vanaf rij {start}"
+    print(f"Saved: {OUTPUT_PATH} ({mode})")
 
 if __name__ == "__main__":
-    process()
+    # --full forceert een volledige herberekening (checkpoint negeren)
+    # --chain start vanuit de vorige seizoenen (CHAIN_SEASONS)
+    args = sys.argv[1:]
+    process(full="--full" in args, prev_seasons=CHAIN_SEASONS if "--chain" in args else None)
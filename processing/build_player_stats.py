@@ -1,42 +1,49 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import json
-
-from sklearn.linear_model import Ridge  # RAPM via ridge regression
-
-from collections import defaultdict
+import scipy.sparse as sp
+
+from ridge import best_alpha, ridge_factor, ridge_fit, ridge_path, ridge_solve  # RAPM via ridge regression
+
+from dutch_dates import CALENDAR_JSON, load_calendar_table
+from ids import REGISTRY_PATH, intern_players, load_registry, player_labels, save_registry
+from pipeline_cache import cached, frame_fingerprint
+from player_matrix import (
+    build_match_index,
+    load_player_matchdata,
+    load_player_matrix,
+    player_totals,
+    starting_lineup_rows,
+    stream_player_totals,
+    team_last_n,
+)
+from events import load_events, normalize_events
+from segments import build_segments, empty_segments, prepare_events
 
 PLAYER_INPUT = "data_raw/player_matchdata.csv"
-CALENDAR_JSON = "data_raw/match_calendar.json"
 OUTPUT_PATH = "data_raw/player_stats.csv"
 MATCH_EVENTS = "data_raw/match_events.csv"
 TEAM_ELO_JSON = "public/data/team_elo.json"  # <-- NIEUW: ELO JSON
 
-XPPM_RIDGE_ALPHA = 250.0   # sterkere shrinkage dan RAPM; kan je later bijtunen
+# streaming-modus (--stream): zoveel speler-matchrijen per blok
+CHUNK_SIZE = 20_000
 
+# modules waarvan de broncode de gecachete RAPM-segmenten/-coëfficiënten bepaalt
+RAPM_CODE = (__name__, "segments", "ridge", "events", "player_matrix", "ids")
 
-# zelfde NL-datums als in build_data_team.py
-MONTH_MAP_NL = {
-    "JANUARI": 1, "FEBRUARI": 2, "MAART": 3, "APRIL": 4, "MEI": 5, "JUNI": 6,
-    "JULI": 7, "AUGUSTUS": 8, "SEPTEMBER": 9, "OKTOBER": 10, "NOVEMBER": 11, "DECEMBER": 12,
-}
+XPPM_RIDGE_ALPHA = 250.0   # sterkere shrinkage dan RAPM; kan je later bijtunen
+
+# alpha-selectie (--select-alpha): grid en uitvoer
+ALPHA_GRID = np.logspace(0, 5, 51)   # 1 … 100 000
+ALPHA_SELECTION_PATH = "data_raw/ridge_alpha_selection.json"
 
-def parse_dutch_date(s: str) -> pd.Timestamp:
-    s = str(s).strip()
-    if "," in s:
-        s = s.split(",", 1)[1].strip()
-    parts = s.split()
-    day = int(parts[0])
-    month = MONTH_MAP_NL[parts[1].upper()]
-    year = int(parts[2])
-    return pd.Timestamp(year=year, month=month, day=day)
 
 def load_calendar():
-    with open(CALENDAR_JSON, "r", encoding="utf8") as f:
-        matches = json.load(f)
-    d = pd.DataFrame(matches)
-    d["date"] = d["date"].apply(parse_dutch_date)
-    return d[["url", "date"]]
+    """url + geparste datum uit de gedeelde (gememoiseerde) kalendertabel."""
+    return load_calendar_table(CALENDAR_JSON)[["url", "date"]]
 
 
 def load_team_elo(path: str = TEAM_ELO_JSON):
@@ -69,6 +76,67 @@ def load_team_elo(path: str = TEAM_ELO_JSON):
 
 
 
+# --------------------------------------------------------------------
+# Sparse design-matrices voor RAPM / xPPM (rechtstreeks uit de line-ups)
+# --------------------------------------------------------------------
+def segment_players(segs: dict) -> np.ndarray:
+    """Gesorteerde unieke speler-ID's over alle segmenten (kolomvolgorde van de design)."""
+    return np.unique(segs["lineup"])
+
+
+def segment_design(segs: dict, players: np.ndarray) -> sp.csr_matrix:
+    """
+    n_seg × (n_pl + 1) CSR: +1 voor thuisspelers, -1 voor uitspelers op het veld,
+    laatste kolom = intercept. Rechtstreeks uit de platte line-upbuffer (zie
+    segments.py); geheugen schaalt met het aantal line-up entries i.p.v.
+    segmenten × spelers.
+    """
+    n_seg, n_pl = len(segs["seg"]), len(players)
+    counts = np.diff(segs["lineup_ptr"])
+    bucket = np.repeat(np.arange(2 * n_seg), counts)      # 2k = thuis, 2k+1 = uit
+    rows = np.r_[bucket // 2, np.arange(n_seg)]
+    cols = np.r_[np.searchsorted(players, segs["lineup"]), np.full(n_seg, n_pl)]
+    vals = np.r_[np.where(bucket % 2 == 0, 1.0, -1.0), np.ones(n_seg)]
+    # dubbele (rij, kolom) worden opgeteld, zoals X[i, j] += 1 in de dense versie
+    return sp.csr_matrix((vals, (rows, cols)), shape=(n_seg, n_pl + 1))
+
+
+def paired_design(A: sp.csr_matrix) -> sp.csr_matrix:
+    """
+    2 rijen per segment (off/def/xPPM): rij 2k = segment k vanuit thuisploeg,
+    rij 2k+1 = gespiegeld (spelerkolommen × -1, intercept blijft 1).
+    """
+    n_seg = A.shape[0]
+    flip = np.r_[-np.ones(A.shape[1] - 1), 1.0]
+    B = sp.vstack([A, A @ sp.diags(flip)], format="csr")
+    order = np.empty(2 * n_seg, dtype=np.int64)
+    order[0::2] = np.arange(n_seg)
+    order[1::2] = np.arange(n_seg) + n_seg
+    return B[order]
+
+
+def _interleave(a, b) -> np.ndarray:
+    out = np.empty(2 * len(a), dtype=float)
+    out[0::2] = a
+    out[1::2] = b
+    return out
+
+
+def _rapm_targets(segs: dict) -> dict:
+    """Targets en gewichten (per minuut, gewicht = duur) voor RAPM totaal en off/def."""
+    seg = segs["seg"]
+    dur = np.where(seg["duration"] != 0, seg["duration"], 1.0)
+    gf = seg["gf"]   # goals home in het segment
+    ga = seg["ga"]   # goals away in het segment
+    return {
+        "y_tot": (gf - ga) / dur,
+        "w_tot": dur,
+        "y_off": _interleave(gf / dur, ga / dur),      # goals van de aanvallende ploeg
+        "y_def": _interleave(-ga / dur, -gf / dur),    # minder tegengoals = positief
+        "w_pair": _interleave(dur, dur),
+    }
+
+
 # --------------------------------------------------------------------
 # RAPM helper: bouw segmenten + ridge regression over doelpuntensaldo
 # --------------------------------------------------------------------
@@ -78,6 +146,8 @@ def compute_rapm_from_logs(
     alpha: float = 80.0,
     return_segments: bool = False,
     split_off_def: bool = False,
+    registry: dict | None = None,
+    lineups: pd.DataFrame | None = None,
 ):
     """
     Regularized Adjusted Plus-Minus per 90 minuten (RAPM_per90).
@@ -88,6 +158,12 @@ def compute_rapm_from_logs(
     - Er wordt een extra intercept-kolom toegevoegd aan alle design-matrices,
       zodat het gemiddelde niveau niet in spelerscoefs gepropt wordt.
     - Default alpha is verhoogd naar 80.0 voor stabielere coefs.
+    - Spelers zijn intern (ploeg, speler)-ID's uit de ID-registry (zie ids.py);
+      de resultaten en de spelerslijsten in de segmenten zijn op ID geïndexeerd.
+    - return_segments=True geeft de segmenten als structured array + platte
+      line-upbuffer terug (zie segments.build_segments), niet als DataFrame.
+    - lineups: basiself per (match, ploeg) als (Match URL, Team, player_id),
+      bv. uit de streaming-modus; dan wordt player_match_df niet gebruikt.
     """
 
     def empty_result():
@@ -96,407 +172,78 @@ def compute_rapm_from_logs(
             return {"total": s, "off": s, "def": s}
         return pd.Series(dtype=float)
 
-    pm = player_match_df.copy()
     me = match_events_df.copy()
 
     if me.empty:
         if return_segments:
-            return empty_result(), pd.DataFrame()
+            return empty_result(), empty_segments()
         return empty_result()
 
-    # minuten als integer
-    me["minute"] = pd.to_numeric(me["minute"], errors="coerce").fillna(0).astype(int)
+    # getypeerde kolommen (code, minute_abs) — enkel normaliseren als de caller dat nog niet deed
+    if "code" not in me.columns:
+        me = normalize_events(me)
 
-    segments: list[dict] = []
-
-    def goals_delta_minute(df_minute, home_team, away_team):
-        """
-        Bepaal GF/GA voor deze minuut enkel uit events:
-        - Goal / Penalty → goal voor 'team'
-        - Own Goal        → goal voor 'team_against'
-        """
-        gf = ga = 0  # gf = goals home-team, ga = goals away-team
-        for _, r in df_minute.iterrows():
-            ev = str(r["event"]).strip().lower()
-            team = str(r["team"])
-            team_against = str(r.get("team_against", ""))
-
-            if ev in ("goal", "penalty"):
-                if team == home_team:
-                    gf += 1
-                elif team == away_team:
-                    ga += 1
-            elif ev == "own goal":
-                # own goal = goal voor tegenstander
-                if team == home_team:
-                    ga += 1
-                elif team == away_team:
-                    gf += 1
-                elif team_against:
-                    if team_against == home_team:
-                        gf += 1
-                    elif team_against == away_team:
-                        ga += 1
-
-        return gf, ga
-
-    # per match segmenten bouwen
-    for match_id, ev in me.groupby("matchurl"):
-        ev = ev.sort_values("minute")
-
-        home = str(ev["home_team"].iloc[0])
-        away = str(ev["away_team"].iloc[0])
-
-        pm_m = pm[pm["Match URL"] == match_id]
-
-        # startopstelling
-        home_on = set(pm_m[(pm_m["Team"] == home) & (pm_m["Starting Player"])]["Player Name"])
-        away_on = set(pm_m[(pm_m["Team"] == away) & (pm_m["Starting Player"])]["Player Name"])
-
-        # fallback als 'Starting Player' niet goed gevuld is
-        if not home_on:
-            home_on = set(pm_m[(pm_m["Team"] == home) & (pm_m["Minutes Played"] > 0)]["Player Name"])
-        if not away_on:
-            away_on = set(pm_m[(pm_m["Team"] == away) & (pm_m["Minutes Played"] > 0)]["Player Name"])
-
-        if not home_on and not away_on:
-            # geen betrouwbare line-ups → skip
-            continue
-
-        # groepeer events per minuut
-        ev_by_minute = {m: g for m, g in ev.groupby("minute")}
-
-        # alleen minuten met een "structurele" gebeurtenis
-        # (goal/penalty/own goal, wissel, rode kaart)
-        def is_boundary_minute(df_min):
-            for _, r in df_min.iterrows():
-                ev_type = str(r["event"]).strip().lower()
-                if ev_type in ("goal", "penalty", "own goal"):
-                    return True
-                if "substitute in" in ev_type or "substitute out" in ev_type:
-                    return True
-                if ev_type in ("red card", "yellow-red card", "yellow card - red card"):
-                    return True
-            return False
-
-        boundary_minutes = [m for m, g in ev_by_minute.items() if is_boundary_minute(g)]
-        minutes_sorted = sorted(boundary_minutes)
-
-        # NIEUW: matchen zonder enige 'boundary minute' → één 0–0 segment van 90'
-        if not minutes_sorted:
-            segments.append({
-                "match": match_id,
-                "home": home,
-                "away": away,
-                "duration": 90.0,
-                "gd_delta": 0.0,
-                "gf": 0.0,
-                "ga": 0.0,
-                "home_players": list(home_on),
-                "away_players": list(away_on),
-                "t_start": 0.0,
-                "t_end": 90.0,
-                "gd_start": 0.0,
-                "gd_end": 0.0,
-                "man_diff_start": float(len(home_on) - len(away_on)),
-                "man_diff_end": float(len(home_on) - len(away_on)),
-            })
-            continue
+    # (ploeg, speler) → stabiele integer-ID's
+    reg = load_registry() if registry is None else registry
+    if lineups is None:
+        pm = player_match_df.copy()
+        pm["player_id"] = intern_players(reg, pm["Team"], pm["Player Name"])
+        lineups = starting_lineup_rows(build_match_index(pm), key="player_id")
+    me["player_id"] = intern_players(reg, me["team"], me["player_name"])
+    save_registry(reg)
 
+    # segmenten: gevectoriseerd uit gesorteerde event-arrays + basiself per (match, ploeg)
+    segs = build_segments(prepare_events(me), lineups)
 
-        last_minute = 0
-        max_minute = max(minutes_sorted)
-
-        # huidige score & manpower bijhouden
-        score_home = 0
-        score_away = 0
-
-        for minute in minutes_sorted:
-            df_min = ev_by_minute[minute]
-
-            # state bij START van het segment
-            t_start = float(last_minute)
-            t_end   = float(minute)
-
-            gd_start = float(score_home - score_away)
-            man_start = float(len(home_on) - len(away_on))
-
-            # segment [last_minute, minute)
-            duration = max(minute - last_minute, 1)
-            gf, ga = goals_delta_minute(df_min, home, away)
-            gd_delta = gf - ga  # positief = goed voor home
-
-            gd_end = gd_start + gd_delta
-
-            # lineup NA de events (voor volgende segment + end-state)
-            home_on_next = set(home_on)
-            away_on_next = set(away_on)
-
-            for _, r in df_min.iterrows():
-                ev_type = str(r["event"]).strip().lower()
-                team_ev = str(r["team"])
-                player_ev = str(r["player_name"])
-
-                if "substitute in" in ev_type:
-                    if team_ev == home:
-                        home_on_next.add(player_ev)
-                    elif team_ev == away:
-                        away_on_next.add(player_ev)
-                elif "substitute out" in ev_type:
-                    if team_ev == home:
-                        home_on_next.discard(player_ev)
-                    elif team_ev == away:
-                        away_on_next.discard(player_ev)
-                elif ev_type in ("red card", "yellow-red card", "yellow card - red card"):
-                    if team_ev == home:
-                        home_on_next.discard(player_ev)
-                    elif team_ev == away:
-                        away_on_next.discard(player_ev)
-
-            man_end = float(len(home_on_next) - len(away_on_next))
-
-            segments.append({
-                "match": match_id,
-                "home": home,
-                "away": away,
-                "duration": float(duration),
-                "gd_delta": float(gd_delta),
-                "gf": float(gf),   # goals home in dit segment
-                "ga": float(ga),   # goals away in dit segment
-                "home_players": list(home_on),        # spelers tijdens segment
-                "away_players": list(away_on),
-                "t_start": t_start,
-                "t_end": t_end,
-                "gd_start": gd_start,
-                "gd_end": gd_end,
-                "man_diff_start": man_start,
-                "man_diff_end": man_end,
-            })
-
-            # state updaten voor volgende segment
-            score_home += gf
-            score_away += ga
-            home_on = home_on_next
-            away_on = away_on_next
-            last_minute = minute
-
-            # events van deze minuut toepassen op on-field sets (voor volgende segment)
-            for _, r in df_min.iterrows():
-                ev_type = str(r["event"]).strip().lower()
-                team_ev = str(r["team"])
-                player_ev = str(r["player_name"])
-
-                if "substitute in" in ev_type:
-                    if team_ev == home:
-                        home_on.add(player_ev)
-                    elif team_ev == away:
-                        away_on.add(player_ev)
-                elif "substitute out" in ev_type:
-                    if team_ev == home:
-                        home_on.discard(player_ev)
-                    elif team_ev == away:
-                        away_on.discard(player_ev)
-                elif ev_type in ("red card", "yellow-red card", "yellow card - red card"):
-                    if team_ev == home:
-                        home_on.discard(player_ev)
-                    elif team_ev == away:
-                        away_on.discard(player_ev)
-
-            last_minute = minute
-
-        # staartsegment tot 90' (enkel speeltijd, geen extra goals)
-        end_min = max(max_minute + 1, 90)
-        if last_minute < end_min and (home_on or away_on):
-            duration = end_min - last_minute
-
-            t_start = float(last_minute)
-            t_end   = float(end_min)
-            gd_start = float(score_home - score_away)
-            gd_end   = gd_start
-            man = float(len(home_on) - len(away_on))
-
-            segments.append({
-                "match": match_id,
-                "home": home,
-                "away": away,
-                "duration": float(duration),
-                "gd_delta": 0.0,
-                "gf": 0.0,
-                "ga": 0.0,
-                "home_players": list(home_on),
-                "away_players": list(away_on),
-                "t_start": t_start,
-                "t_end": t_end,
-                "gd_start": gd_start,
-                "gd_end": gd_end,
-                "man_diff_start": man,
-                "man_diff_end": man,
-            })
-
-
-    if not segments:
+    if not len(segs["seg"]):
         if return_segments:
-            return empty_result(), pd.DataFrame()
+            return empty_result(), segs
         return empty_result()
 
-    seg_df = pd.DataFrame(segments)
-
-    # zet spelerslijsten naar object zodat iterrows/itertuples goed werken
-    seg_df["home_players"] = seg_df["home_players"].apply(list)
-    seg_df["away_players"] = seg_df["away_players"].apply(list)
-
     # alle spelers
-    all_players = sorted(
-        set(
-            p
-            for lst in (seg_df["home_players"].tolist() + seg_df["away_players"].tolist())
-            for p in lst
-        )
-    )
-    if not all_players:
+    all_players = segment_players(segs)
+    if not len(all_players):
         if return_segments:
-            return empty_result(), seg_df
+            return empty_result(), segs
         return empty_result()
 
-    idx_map = {p: i for i, p in enumerate(all_players)}
-
-    # Extra index voor intercept-kolom (constant 1.0)
-    n_seg = len(seg_df)
     n_pl = len(all_players)
-    intercept_idx = n_pl  # laatste kolom in design-matrices
+
+    t = _rapm_targets(segs)
 
     # ---------- TOTALE RAPM (GF - GA) ----------
-    X_tot = np.zeros((n_seg, n_pl + 1), dtype=float)
-    y_tot = np.zeros(n_seg, dtype=float)
-    w_tot = np.zeros(n_seg, dtype=float)
-
-    for i, row in seg_df.iterrows():
-        dur = float(row["duration"]) if row["duration"] else 1.0
-        gf = float(row.get("gf", 0.0))
-        ga = float(row.get("ga", 0.0))
-
-        y_tot[i] = (gf - ga) / dur
-        w_tot[i] = dur
-
-        for p in row["home_players"]:
-            j = idx_map[p]
-            X_tot[i, j] += 1.0
-        for p in row["away_players"]:
-            j = idx_map[p]
-            X_tot[i, j] -= 1.0
-
-        # intercept
-        X_tot[i, intercept_idx] = 1.0
-
-    # ---------- OFFENSIEVE RAPM ----------
-    # 2 rijen per segment: home-aanval + away-aanval
-    n_off = 2 * n_seg
-    X_off = np.zeros((n_off, n_pl + 1), dtype=float)
-    y_off = np.zeros(n_off, dtype=float)
-    w_off = np.zeros(n_off, dtype=float)
-
-    for k, row in enumerate(seg_df.itertuples(index=False)):
-        dur = float(row.duration) if row.duration else 1.0
-        gf_home = float(row.gf)
-        gf_away = float(row.ga)  # goals away = goals tegen home
-        home_players = row.home_players
-        away_players = row.away_players
-
-        # home als aanvallende ploeg
-        r_home = 2 * k
-        y_off[r_home] = gf_home / dur
-        w_off[r_home] = dur
-        for p in home_players:
-            X_off[r_home, idx_map[p]] += 1.0
-        for p in away_players:
-            X_off[r_home, idx_map[p]] -= 1.0
-        X_off[r_home, intercept_idx] = 1.0
-
-        # away als aanvallende ploeg
-        r_away = 2 * k + 1
-        y_off[r_away] = gf_away / dur
-        w_off[r_away] = dur
-        for p in away_players:
-            X_off[r_away, idx_map[p]] += 1.0
-        for p in home_players:
-            X_off[r_away, idx_map[p]] -= 1.0
-        X_off[r_away, intercept_idx] = 1.0
-
-    # ---------- DEFENSIEVE RAPM ----------
-    # 2 rijen per segment: home-verdedigt + away-verdedigt
-    n_def = 2 * n_seg
-    X_def = np.zeros((n_def, n_pl + 1), dtype=float)
-    y_def = np.zeros(n_def, dtype=float)
-    w_def = np.zeros(n_def, dtype=float)
-
-    for k, row in enumerate(seg_df.itertuples(index=False)):
-        dur = float(row.duration) if row.duration else 1.0
-        # goals against per team
-        ga_home = float(row.ga)  # tegengoals home = goals away
-        ga_away = float(row.gf)  # tegengoals away = goals home
-        home_players = row.home_players
-        away_players = row.away_players
-
-        # home in verdediging
-        r_home = 2 * k
-        y_def[r_home] = -ga_home / dur  # minder tegengoals = positief
-        w_def[r_home] = dur
-        for p in home_players:
-            X_def[r_home, idx_map[p]] += 1.0
-        for p in away_players:
-            X_def[r_home, idx_map[p]] -= 1.0
-        X_def[r_home, intercept_idx] = 1.0
-
-        # away in verdediging
-        r_away = 2 * k + 1
-        y_def[r_away] = -ga_away / dur
-        w_def[r_away] = dur
-        for p in away_players:
-            X_def[r_away, idx_map[p]] += 1.0
-        for p in home_players:
-            X_def[r_away, idx_map[p]] -= 1.0
-        X_def[r_away, intercept_idx] = 1.0
-
-        # ---------- ridge regressie ----------
+    # sparse n_seg × (n_pl + 1), laatste kolom = intercept
+    X_tot = segment_design(segs, all_players)
+    y_tot, w_tot = t["y_tot"], t["w_tot"]
+
+    # ---------- OFFENSIEVE / DEFENSIEVE RAPM ----------
+    # 2 rijen per segment (home, away); off en def delen design-matrix en
+    # gewichten, enkel het target verschilt
+    X_off = paired_design(X_tot)
+    y_off, y_def = t["y_off"], t["y_def"]
+    w_off = t["w_pair"]
+
+    # ---------- ridge regressie ----------
     # Let op: laatste kolom is intercept, die negeren we in de output.
-    model_tot = Ridge(alpha=alpha, fit_intercept=False)
-    model_tot.fit(X_tot, y_tot, sample_weight=w_tot)
-    coef_tot = model_tot.coef_[:n_pl] * 90.0  # per 90 min
-
-    # OFF en DEF zoals voorheen
-    model_off = Ridge(alpha=alpha, fit_intercept=False)
-    model_off.fit(X_off, y_off, sample_weight=w_off)
-    coef_off = model_off.coef_[:n_pl] * 90.0
-
-    model_def = Ridge(alpha=alpha, fit_intercept=False)
-    model_def.fit(X_def, y_def, sample_weight=w_def)
-    coef_def = model_def.coef_[:n_pl] * 90.0
+    # Eén eigendecompositie per design (zie ridge.py): totaal apart, OFF en DEF
+    # delen design en gewichten en worden samen opgelost (2 rechterleden).
+    fac_tot = ridge_factor(X_tot, w_tot)
+    fit_tot = ridge_fit(fac_tot, y_tot, alpha, se=True)
+    coef_tot = fit_tot["coef"][:n_pl] * 90.0  # per 90 min
+
+    fac_pair = None
+    coef_off = coef_def = np.zeros(n_pl)
+    if split_off_def:
+        fac_pair = ridge_factor(X_off, w_off)
+        B = ridge_solve(fac_pair, np.column_stack([y_off, y_def]), alpha)
+        coef_off = B[:n_pl, 0] * 90.0
+        coef_def = B[:n_pl, 1] * 90.0
 
     # ---------- ONZEKERHEID TOTALE RAPM (SE, CI, z-score) ----------
-    # We doen dit enkel voor het totale model (GF - GA).
+    # We doen dit enkel voor het totale model (GF - GA):
+    # var(beta) = diag((X'WX + alpha I)^-1) * sigma2, sigma2 = RSS / (n - df_eff)
     try:
-        # Gewogen XtWX
-        XtW = X_tot.T * w_tot  # (n_pl+1, n_seg)
-        XtWX = XtW @ X_tot     # (n_pl+1, n_pl+1)
-
-        # Ridge-matrix en inverse
-        ridge_mat = XtWX + alpha * np.eye(XtWX.shape[0])
-        ridge_inv = np.linalg.inv(ridge_mat)
-
-        # Residuele variantie schatten
-        y_pred = model_tot.predict(X_tot)
-        resid = y_tot - y_pred
-        rss = float(np.sum(w_tot * resid**2))
-
-        # effectieve vrijheidsgraden (trace van "hat"-matrix)
-        hat_mat = XtWX @ ridge_inv
-        df_eff = float(np.trace(hat_mat))
-        denom = max(len(y_tot) - df_eff, 1.0)
-        sigma2 = rss / denom
-
-        # variantie van beta (ongeveer)
-        var_beta = np.diag(ridge_inv) * sigma2  # (n_pl+1,)
-        se_tot = np.sqrt(var_beta[:n_pl]) * 90.0  # per 90 min
+        se_tot = fit_tot["se"][:n_pl] * 90.0  # per 90 min
 
         # 95% CI en z-score
         ci_low = coef_tot - 1.96 * se_tot
@@ -533,17 +280,71 @@ def compute_rapm_from_logs(
             "total_ci_low": rapm_ci_low,
             "total_ci_high": rapm_ci_high,
             "total_z": rapm_z,
+            # gedeelde factor van het off/def-design, herbruikbaar voor xPPM
+            "paired_factor": fac_pair,
         }
     else:
         result = rapm_tot
 
     if return_segments:
-        return result, seg_df
+        return result, segs
     return result
 
 
 
-def _build_expected_points_lookup(seg_df: pd.DataFrame, smooth_k: float = 20.0):
+def load_rapm_segments(
+    alpha: float = 80.0,
+    split_off_def: bool = True,
+    player_match_df: pd.DataFrame | None = None,
+    pm_path: str = PLAYER_INPUT,
+    events_path: str = MATCH_EVENTS,
+    lineups: pd.DataFrame | None = None,
+):
+    """
+    (RAPM-resultaat, segs) zoals compute_rapm_from_logs(return_segments=True),
+    gecachet op schijf (zie pipeline_cache) op de inhoud van player_matchdata
+    en match_events, de broncode van de RAPM-stap (RAPM_CODE) en
+    alpha/split_off_def. build_player_stats en de exporters delen zo één
+    berekening; wijzigt een bronbestand of de code, dan wijzigt de sleutel.
+
+    player_match_df: rijen die al uit pm_path ingelezen zijn, anders wordt
+    pm_path geladen. lineups: basiself per (match, ploeg) uit de
+    streaming-modus (zie player_matrix.stream_player_totals); pm_path wordt
+    dan niet ingelezen. Wordt een van beide meegegeven, dan zit de inhoud
+    van dat frame in de sleutel i.p.v. pm_path. Events en segmenten staan
+    wel volledig in geheugen: de RAPM-stap zelf streamt niet.
+    """
+    me = load_events(events_path)
+
+    # ID's eerst toekennen en bewaren: de registry kent dan alle spelers uit de
+    # (gecachete) segmenten, en de ID-toewijzing zelf zit mee in de sleutel
+    reg = load_registry()
+    pm = None
+    if lineups is None:
+        pm = player_match_df if player_match_df is not None else load_player_matchdata(pm_path)
+        intern_players(reg, pm["Team"], pm["Player Name"])
+    intern_players(reg, me["team"], me["player_name"])
+    save_registry(reg)
+
+    given = lineups if lineups is not None else player_match_df
+    paths = ([pm_path] if given is None else []) + [events_path]
+    paths += [REGISTRY_PATH] if os.path.exists(REGISTRY_PATH) else []
+    extra = (float(alpha), bool(split_off_def))
+    if given is not None:
+        extra += ("lineups" if lineups is not None else "player_match_df", frame_fingerprint(given))
+
+    return cached(
+        "rapm_segments", paths,
+        lambda: compute_rapm_from_logs(
+            pm, me, alpha=alpha, return_segments=True, split_off_def=split_off_def,
+            registry=reg, lineups=lineups,
+        ),
+        extra=extra,
+        code=[sys.modules[m] for m in RAPM_CODE],
+    )
+
+
+def _build_expected_points_lookup(segs: dict, smooth_k: float = 20.0):
     """
     Bouwt een gesmoothte lookup:
       key = (minute_bucket, goal_diff_clamped, man_diff_clamped)
@@ -555,104 +356,59 @@ def _build_expected_points_lookup(seg_df: pd.DataFrame, smooth_k: float = 20.0):
       zodat states met weinig waarnemingen naar het gemiddelde toegetrokken worden.
     - We clampen goal_diff en manpower_diff naar een beperkte range
       zodat extreme states automatisch gepoold worden.
+    - De lookup is een tabel (6 minuutvakken × 7 saldo's × 5 manpower);
+      get_ep werkt op scalars én op NumPy-arrays.
     """
-    if seg_df is None or seg_df.empty:
+    def state_index(minute, gd, man):
+        # minuutvak: 0–14, 15–29, 30–44, 45–59, 60–74, 75–89
+        t = np.clip(np.asarray(minute, dtype=float), 0.0, 89.9)
+        mb = (t // 15).astype(int)
+        gd_int = np.clip(np.round(np.asarray(gd, dtype=float)), -3, 3).astype(int)     # pool extreme scores
+        man_int = np.clip(np.round(np.asarray(man, dtype=float)), -2, 2).astype(int)   # pool extreme manpower
+        return mb, gd_int + 3, man_int + 2
+
+    if segs is None or not len(segs["seg"]):
         # veilige fallback
         def _ep_const(minute, gd, man):
-            return 1.5
+            return np.full(np.shape(minute), 1.5) if np.ndim(minute) else 1.5
         return _ep_const, 1.5
 
-    # --- eindscore en punten per match ---
-    match_scores = seg_df.groupby("match")[["gf", "ga"]].sum().reset_index()
-    match_pts = {}
-    for _, r in match_scores.iterrows():
-        hs = int(r["gf"])
-        as_ = int(r["ga"])
-        if hs > as_:
-            ph, pa = 3.0, 0.0
-        elif hs == as_:
-            ph, pa = 1.0, 1.0
-        else:
-            ph, pa = 0.0, 3.0
-        match_pts[str(r["match"])] = (ph, pa)
-
-    def bucket_min(t: float) -> int:
-        t = float(t)
-        t = max(0.0, min(89.9, t))
-        # bv. 0–14, 15–29, 30–44, 45–59, 60–74, 75–89
-        return int(t // 15 * 15)
-
-    def clamp(x: float, lo: int, hi: int) -> int:
-        xi = int(round(x))
-        return max(lo, min(hi, xi))
-
-    # stats[key] = [sum_points, count]
-    stats = defaultdict(lambda: [0.0, 0])
-
-    for row in seg_df.itertuples(index=False):
-        mid = str(row.match)
-        if mid not in match_pts:
-            continue
-        ph, pa = match_pts[mid]
-
-        t0 = getattr(row, "t_start", 0.0)
-        gd0 = getattr(row, "gd_start", 0.0)
-        man0 = getattr(row, "man_diff_start", 0.0)
-
-        mb = bucket_min(t0)
-        gd_int = clamp(gd0, -3, 3)      # pool extreme scores
-        man_int = clamp(man0, -2, 2)    # pool extreme manpower
-
-        # home-perspectief
-        key_home = (mb, gd_int, man_int)
-        stats[key_home][0] += ph
-        stats[key_home][1] += 1
+    seg = segs["seg"]
 
-        # away-perspectief (score en manpower gespiegeld)
-        key_away = (mb, -gd_int, -man_int)
-        stats[key_away][0] += pa
-        stats[key_away][1] += 1
+    # --- eindscore en punten per match (home-perspectief) ---
+    hs = np.bincount(seg["match"], weights=seg["gf"])
+    as_ = np.bincount(seg["match"], weights=seg["ga"])
+    ph = np.select([hs > as_, hs == as_], [3.0, 1.0], 0.0)[seg["match"]]
+    pa = np.select([hs > as_, hs == as_], [0.0, 1.0], 3.0)[seg["match"]]
 
-    lookup = {}
-    total_sum = 0.0
-    total_cnt = 0
+    # stats[key] = som punten / aantal; home-perspectief + away-perspectief (gespiegeld)
+    mb, gd_i, man_i = state_index(seg["t_start"], seg["gd_start"], seg["man_diff_start"])
+    sums = np.zeros((6, 7, 5))
+    cnts = np.zeros((6, 7, 5))
+    np.add.at(sums, (mb, gd_i, man_i), ph)
+    np.add.at(cnts, (mb, gd_i, man_i), 1)
+    np.add.at(sums, (mb, 6 - gd_i, 4 - man_i), pa)
+    np.add.at(cnts, (mb, 6 - gd_i, 4 - man_i), 1)
 
-    for key, (s, c) in stats.items():
-        if c <= 0:
-            continue
-        total_sum += s
-        total_cnt += c
-
-    global_mean = (total_sum / total_cnt) if total_cnt > 0 else 1.5
+    total_cnt = cnts.sum()
+    global_mean = (sums.sum() / total_cnt) if total_cnt > 0 else 1.5
 
-    # Empirical Bayes smoothing: shrink naar global_mean
-    for key, (s, c) in stats.items():
-        if c > 0:
-            ep_hat = (s + smooth_k * global_mean) / (c + smooth_k)
-            lookup[key] = ep_hat
+    # Empirical Bayes smoothing: shrink naar global_mean (onbekende states = global_mean)
+    table = np.where(cnts > 0, (sums + smooth_k * global_mean) / (cnts + smooth_k), global_mean)
 
     def get_ep(minute, gd, man):
-        mb = bucket_min(minute)
-        gd_int = clamp(gd, -3, 3)
-        man_int = clamp(man, -2, 2)
-        return lookup.get((mb, gd_int, man_int), global_mean)
+        return table[state_index(minute, gd, man)]
 
     return get_ep, global_mean
 
 
-def compute_xppm_from_segments(seg_df, alpha: float = XPPM_RIDGE_ALPHA):
+def _xppm_targets(segs: dict):
     """
-    Expected Points Plus-Minus (xPPM) per 90 min.
-
-    - gebruikt het gesmoothe expected-points model uit _build_expected_points_lookup
-    - bouwt een plus-minus regressie zoals RAPM, maar met ander target:
-        y = (ΔEP_home - ΔEP_away) / duur  (per minuut)
-    - we schalen de coëfficiënten naar per 90 min
+    xPPM-target per rij van het gepaarde design (home, gespiegelde away):
+    verschil in (ELO-gecorrigeerde) expected-points-verandering per minuut.
+    Returnt (y, w) met w = duur.
     """
-    if seg_df is None or seg_df.empty:
-        return {}, pd.Series(dtype=float)
-
-    get_ep, _ = _build_expected_points_lookup(seg_df)
+    get_ep, _ = _build_expected_points_lookup(segs)
 
 
     # --- ELO: opponent strength correction ---
@@ -670,114 +426,66 @@ def compute_xppm_from_segments(seg_df, alpha: float = XPPM_RIDGE_ALPHA):
         elo = elo_map.get(opp_team_name, league_mean_elo)
         return k * (elo - league_mean_elo) / 100.0
 
-    def get_ep_corrected(minute, gd, man, opponent_team):
-        """
-        Base-EP uit het gesmoothe state-model,
-        gecorrigeerd voor ELO van de tegenstander.
-        """
-        base_ep = get_ep(minute, gd, man)
-        return base_ep - opponent_modifier(opponent_team)
+    # correctie per team-index (segs["teams"])
+    team_mod = np.array([opponent_modifier(t) for t in segs["teams"]], dtype=float)
+
+    seg = segs["seg"]
+    dur = np.where(seg["duration"] > 0, seg["duration"], 1.0)
 
+    # Expected Points begin/einde, MET ELO-correctie voor de tegenstander
+    mod_home = team_mod[seg["away"]]   # tegenstander van de thuisploeg
+    mod_away = team_mod[seg["home"]]
+    ep_home_start = get_ep(seg["t_start"], seg["gd_start"], seg["man_diff_start"]) - mod_home
+    ep_home_end = get_ep(seg["t_end"], seg["gd_end"], seg["man_diff_end"]) - mod_home
+    ep_away_start = get_ep(seg["t_start"], -seg["gd_start"], -seg["man_diff_start"]) - mod_away
+    ep_away_end = get_ep(seg["t_end"], -seg["gd_end"], -seg["man_diff_end"]) - mod_away
 
+    d_home = ep_home_end - ep_home_start
+    d_away = ep_away_end - ep_away_start
+
+    # target = verschil in EP-verandering per minuut; away-rij = spiegel
+    y_home = (d_home - d_away) / dur
+    return _interleave(y_home, -y_home), _interleave(dur, dur)
+
+
+def compute_xppm_from_segments(segs, alpha: float = XPPM_RIDGE_ALPHA, factor: dict | None = None):
+    """
+    Expected Points Plus-Minus (xPPM) per 90 min.
+
+    - gebruikt het gesmoothe expected-points model uit _build_expected_points_lookup
+    - bouwt een plus-minus regressie zoals RAPM, maar met ander target:
+        y = (ΔEP_home - ΔEP_away) / duur  (per minuut)
+    - we schalen de coëfficiënten naar per 90 min
+    - segs: segmenten uit compute_rapm_from_logs(return_segments=True)
+    - factor: de "paired_factor" uit compute_rapm_from_logs(split_off_def=True)
+      op dezelfde segmenten; dan wordt het design niet opnieuw gedecomponeerd
+    """
+    if segs is None or not len(segs["seg"]):
+        return {}, pd.Series(dtype=float)
 
     # alle spelers
-    all_players = sorted(
-        set(p for lst in seg_df["home_players"] for p in lst) |
-        set(p for lst in seg_df["away_players"] for p in lst)
-    )
-    if not all_players:
+    all_players = segment_players(segs)
+    if not len(all_players):
         return {}, pd.Series(dtype=float)
 
-    idx_map = {p: i for i, p in enumerate(all_players)}
     n_pl = len(all_players)
-    n_seg = len(seg_df)
-    intercept_idx = n_pl
-
-    # 2 rijen per segment
-    n_rows = 2 * n_seg
-    X = np.zeros((n_rows, n_pl + 1), dtype=float)
-    y = np.zeros(n_rows, dtype=float)
-    w = np.zeros(n_rows, dtype=float)
-
-    for k, row in enumerate(seg_df.itertuples(index=False)):
-        dur = float(row.duration) if row.duration else 1.0
-        if dur <= 0:
-            dur = 1.0
-
-        # Expected Points begin/einde
-        t0 = getattr(row, "t_start", 0.0)
-        t1 = getattr(row, "t_end", t0 + dur)
-
-        gd0 = getattr(row, "gd_start", 0.0)
-        gd1 = getattr(row, "gd_end", gd0 + float(row.gd_delta))
-
-        man0 = getattr(row, "man_diff_start", 0.0)
-        man1 = getattr(row, "man_diff_end", man0)
-
-        # teamnamen uit segment (zoals je ze in segments hebt gezet)
-        home_team = getattr(row, "home", None)
-        away_team = getattr(row, "away", None)
-
-        # Expected Points MET ELO-correctie voor tegenstander
-        ep_home_start = get_ep_corrected(t0, gd0, man0, away_team)
-        ep_home_end   = get_ep_corrected(t1, gd1, man1, away_team)
-
-        ep_away_start = get_ep_corrected(t0, -gd0, -man0, home_team)
-        ep_away_end   = get_ep_corrected(t1, -gd1, -man1, home_team)
-
-
-        d_home = ep_home_end - ep_home_start
-        d_away = ep_away_end - ep_away_start
-
-        # target = verschil in EP-verandering per minuut
-        y_home_val = (d_home - d_away) / dur
-
-        # Home-rij
-        r_home = 2 * k
-        y[r_home] = y_home_val
-        w[r_home] = dur
-        for p in row.home_players:
-            X[r_home, idx_map[p]] += 1.0
-        for p in row.away_players:
-            X[r_home, idx_map[p]] -= 1.0
-        X[r_home, intercept_idx] = 1.0
-
-        # Away-rij (spiegel)
-        r_away = r_home + 1
-        y[r_away] = -y_home_val
-        w[r_away] = dur
-        for p in row.away_players:
-            X[r_away, idx_map[p]] += 1.0
-        for p in row.home_players:
-            X[r_away, idx_map[p]] -= 1.0
-        X[r_away, intercept_idx] = 1.0
+
+    # 2 rijen per segment (home, gespiegelde away), sparse zoals bij RAPM
+    X = paired_design(segment_design(segs, all_players))
+    y, w = _xppm_targets(segs)
 
     # Ridge-regressie (alleen xPPM, RAPM blijft alpha=80 in een andere functie)
-    model = Ridge(alpha=alpha, fit_intercept=False)
-    model.fit(X, y, sample_weight=w)
+    # zelfde design en gewichten als RAPM off/def → factor hergebruiken indien meegegeven
+    if factor is None or factor["X"].shape != X.shape or not np.array_equal(factor["w"], w):
+        factor = ridge_factor(X, w)
+    fit = ridge_fit(factor, y, alpha, se=True)
 
     # coefs per 90 min
-    coef = model.coef_[:n_pl] * 90.0
+    coef = fit["coef"][:n_pl] * 90.0
 
     # -------- onzekerheid (SE, CI, z-score) --------
     try:
-        XtW = X.T * w           # (p+1, n_rows)
-        XtWX = XtW @ X          # (p+1, p+1)
-
-        ridge_mat = XtWX + alpha * np.eye(XtWX.shape[0])
-        ridge_inv = np.linalg.inv(ridge_mat)
-
-        y_pred = model.predict(X)
-        resid = y - y_pred
-        rss = float(np.sum(w * resid**2))
-
-        hat_mat = XtWX @ ridge_inv
-        df_eff = float(np.trace(hat_mat))
-        denom = max(len(y) - df_eff, 1.0)
-        sigma2 = rss / denom
-
-        var_beta = np.diag(ridge_inv) * sigma2
-        se = np.sqrt(var_beta[:n_pl]) * 90.0
+        se = fit["se"][:n_pl] * 90.0
 
         ci_low = coef - 1.96 * se
         ci_high = coef + 1.96 * se
@@ -805,167 +513,179 @@ def compute_xppm_from_segments(seg_df, alpha: float = XPPM_RIDGE_ALPHA):
         "ci_low": ci_low_s,
         "ci_high": ci_high_s,
         "z": z_s,
-    }, seg_df
+    }, segs
 
 
 
 
 # --------------------------------------------------------------------
-# hoofd-functie: aggregaties per speler + RAPM_per90
+# alpha-selectie voor RAPM (totaal/off/def) en xPPM
 # --------------------------------------------------------------------
-def build_player_stats():
-    # 1) data inladen
-    df = pd.read_csv(PLAYER_INPUT)
-
-    # booleans normaliseren
-    def to_bool(s):
-        return str(s).strip().lower() in ("true", "1", "yes")
-
-    for col in ["Starting Player", "Substituted In", "Substituted Out",
-                "Is Goalkeeper", "Is Captain", "Clean Sheet"]:
-        if col in df.columns:
-            df[col] = df[col].apply(to_bool)
-        else:
-            df[col] = False
-
-    num_cols = [
-        "Minutes Played", "Goals Scored", "Penalties Scored", "Own Goals Scored",
-        "Yellow Cards", "YellowRed Cards", "Red Cards", "Result P",
+def select_ridge_alphas(alphas=ALPHA_GRID, out_path: str = ALPHA_SELECTION_PATH) -> dict:
+    """
+    Kies alpha per model uit één decompositie per design (zie ridge.ridge_path):
+    totaal op het segment-design, off/def en xPPM op het gepaarde design.
+    Keuze = minimale leave-one-match-out fout (matchen zijn de onafhankelijke
+    eenheden); de GCV-keuze wordt ter vergelijking mee weggeschreven.
+
+    Off en def zijn één model ("off_def"): het def-target is het off-target
+    gespiegeld (rij 2k ↔ 2k+1, teken om) op een design dat onder die spiegeling
+    op het intercept na symmetrisch is, dus de spelerscoëfficiënten en de
+    gekozen alpha zijn per constructie identiek. Zie ook RAPM_off/def_per90.
+
+    Schrijft per model de gekozen alpha, de foutcurves en de coëfficiënten
+    (per 90 min) bij de optimale alpha naar out_path.
+    """
+    rapm_res, segs = load_rapm_segments(split_off_def=True)
+    players = segment_players(segs)
+    if not len(players):
+        print("[WARN] geen segmenten voor alpha-selectie")
+        return {}
+    n_pl = len(players)
+    seg = segs["seg"]
+
+    t = _rapm_targets(segs)
+    y_xppm, w_xppm = _xppm_targets(segs)
+    X_tot = segment_design(segs, players)
+
+    fac_tot = ridge_factor(X_tot, t["w_tot"])
+    fac_pair = rapm_res.get("paired_factor") or ridge_factor(paired_design(X_tot), t["w_pair"])
+
+    # (naam, factor, target, groep per rij)
+    models = [
+        ("total", fac_tot, t["y_tot"], seg["match"]),
+        # off en def geven dezelfde spelerscoëfficiënten (zie docstring): één selectie
+        ("off_def", fac_pair, t["y_off"], np.repeat(seg["match"], 2)),
     ]
-    for c in num_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-        else:
-            df[c] = np.nan
-
-    # 2) datum erbij via kalender
-    cal = load_calendar()
-    df = df.merge(cal, left_on="Match URL", right_on="url", how="left")
-    df["date"] = pd.to_datetime(df["date"])
-
-    # match events inladen (voor RAPM)
-    match_events = pd.read_csv(MATCH_EVENTS)
-
-    # 2b) laatste 5 ploegwedstrijden per team bepalen
-    team_last5_urls = {}
-    for team_name, tdf in df.groupby("Team"):
-        team_matches = (
-            tdf[["Match URL", "date"]]
-            .drop_duplicates(subset=["Match URL"])
-            .sort_values("date")
-        )
-        last5_matches = team_matches.tail(5)["Match URL"].tolist()
-        team_last5_urls[team_name] = set(last5_matches)
-
-    # 3) aggregatie per speler
-    records = []
-
-    for (team, player), g in df.groupby(["Team", "Player Name"]):
-        g = g.sort_values("date")
-        if not team or not player:
-            continue
-
-        sel = len(g)
-        started = int(g["Starting Player"].sum())
-        sub_in = int(g["Substituted In"].sum())
-        sub_out = int(g["Substituted Out"].sum())
-        minutes = int(g["Minutes Played"].fillna(0).sum())
-
-        goals = int(g["Goals Scored"].fillna(0).sum())
-        pens = int(g["Penalties Scored"].fillna(0).sum())
-        og = int(g["Own Goals Scored"].fillna(0).sum())
-        yellow = int(g["Yellow Cards"].fillna(0).sum())
-        y2 = int(g["YellowRed Cards"].fillna(0).sum())
-        red = int(g["Red Cards"].fillna(0).sum())
-
-        clean_sheets = int(g["Clean Sheet"].astype(int).sum())
-        captain = int(g["Is Captain"].astype(int).sum())
-        ptype = "Keeper" if g["Is Goalkeeper"].any() else "Speler"
-
-        # MVP p>20/90min: minuten-gewogen Result P voor wedstrijden met >20 min
-        g20 = g[g["Minutes Played"] > 20].copy()
-        if not g20.empty:
-            rp = g20["Result P"].fillna(0)
-            mins_20 = g20["Minutes Played"].fillna(0)
-            total_pts = (rp * mins_20).sum()
-            total_min_20 = mins_20.sum()
-            mvp = round(total_pts / total_min_20, 3) if total_min_20 > 0 else 0.0
-        else:
-            mvp = 0.0
-
-        if minutes > 0:
-            goals90 = round(goals / (minutes / 90.0), 3)
-            yellow90 = round(yellow / (minutes / 90.0), 3)
-        else:
-            goals90 = 0.0
-            yellow90 = 0.0
-
-        # laatste 5 ploegwedstrijden
-        team_urls = team_last5_urls.get(team, set())
-        last5 = g[g["Match URL"].isin(team_urls)].sort_values("date")
-
-        sel_l5 = len(last5)
-        started_l5 = int(last5["Starting Player"].sum())
-        sub_in_l5 = int(last5["Substituted In"].sum())
-        sub_out_l5 = int(last5["Substituted Out"].sum())
-        min_l5 = int(last5["Minutes Played"].fillna(0).sum())
-        goals_l5 = int(last5["Goals Scored"].fillna(0).sum())
-        pens_l5 = int(last5["Penalties Scored"].fillna(0).sum())
-        og_l5 = int(last5["Own Goals Scored"].fillna(0).sum())
-        yellow_l5 = int(last5["Yellow Cards"].fillna(0).sum())
-        y2_l5 = int(last5["YellowRed Cards"].fillna(0).sum())
-        red_l5 = int(last5["Red Cards"].fillna(0).sum())
-        cs_l5 = int(last5["Clean Sheet"].astype(int).sum())
-        cap_l5 = int(last5["Is Captain"].astype(int).sum())
-
-        rec = {
-            "Team": team,
-            "Speler": player,
-            "Selecties": sel,
-            "Gestart": started,
-            "Ingevallen": sub_in,
-            "Vervangen": sub_out,
-            "Speelminuten": minutes,
-            "Goals": goals,
-            "Penalties": pens,
-            "Own Goals": og,
-            "Geel": yellow,
-            "Dubbelgeel": y2,
-            "Rood": red,
-            "Clean sheets": clean_sheets,
-            "Kapitein": captain,
-            "Type": ptype,
-            "MVP p>20/90min": mvp,      # wordt later in JSON overschreven door RAPM
-            "Goals/90min": goals90,
-            "Geel/90min": yellow90,
-
-            # laatste 5
-            "Selecties L5": sel_l5,
-            "Gestart L5": started_l5,
-            "Ingevallen L5": sub_in_l5,
-            "Vervangen L5": sub_out_l5,
-            "Speelminuten L5": min_l5,
-            "Goals L5": goals_l5,
-            "Penalties L5": pens_l5,
-            "Own goals L5": og_l5,
-            "Geel L5": yellow_l5,
-            "Dubbelgeel L5": y2_l5,
-            "Rood L5": red_l5,
-            "Clean sheet L5": cs_l5,
-            "Kapitein L5": cap_l5,
-        }
+    if np.array_equal(w_xppm, fac_pair["w"]):
+        models.append(("xppm", fac_pair, y_xppm, np.repeat(seg["match"], 2)))
+    else:
+        models.append(("xppm", ridge_factor(paired_design(X_tot), w_xppm), y_xppm, np.repeat(seg["match"], 2)))
+
+    # targets met dezelfde factor in één pad (één keer U_g en (I - H_gg) per match)
+    result = {}
+    by_factor: dict[int, list] = {}
+    for m in models:
+        by_factor.setdefault(id(m[1]), []).append(m)
+    for group in by_factor.values():
+        fac, groups = group[0][1], group[0][3]
+        Y = np.column_stack([m[2] for m in group])
+        path = ridge_path(fac, Y, alphas, groups)
+        i_lomo, i_gcv = best_alpha(path, "lomo"), best_alpha(path, "gcv")
+        for j, (name, _, y, _) in enumerate(group):
+            a = float(path["alphas"][i_lomo[j]])
+            result[name] = {
+                "alpha": a,
+                "alpha_gcv": float(path["alphas"][i_gcv[j]]),
+                "lomo": path["lomo"][:, j].tolist(),
+                "gcv": path["gcv"][:, j].tolist(),
+                "df": path["df"].tolist(),
+                "coef_per90": (ridge_solve(fac, y, a)[:n_pl] * 90.0).round(4).tolist(),
+            }
+
+    labels = player_labels(load_registry())
+    out = {
+        "alphas": [float(a) for a in alphas],
+        "players": [{"id": int(p), "team": labels[p][0], "name": labels[p][1]} for p in players],
+        "models": {name: result[name] for name, *_ in models},
+        "notes": {"off_def": "RAPM off en def: gespiegeld target op hetzelfde design, identieke coëfficiënten"},
+    }
+    with open(out_path, "w", encoding="utf8") as f:
+        json.dump(out, f, ensure_ascii=False, separators=(",", ":"))
+
+    for name, *_ in models:
+        r = result[name]
+        print(f"{name:>7}: alpha={r['alpha']:.1f} (GCV: {r['alpha_gcv']:.1f})")
+    print(f"Saved: {out_path}")
+    return out
 
-        records.append(rec)
 
-    # 4) records -> DataFrame
-    out = pd.DataFrame(records)
+# --------------------------------------------------------------------
+# hoofd-functie: aggregaties per speler + RAPM_per90
+# --------------------------------------------------------------------
+def build_player_stats(stream: bool = False, chunksize: int = CHUNK_SIZE):
+    """
+    Standaard: alles in geheugen via de gedeelde sparse speler × match matrices.
+    stream=True: player_matchdata in blokken van `chunksize` rijen met lopende
+    totalen en per ploeg een ringbuffer van de laatste 5 matchen (zelfde uitvoer).
+    Het geheugen van de aggregaties hangt dan af van het aantal spelers i.p.v.
+    speler-matchrijen; RAPM/xPPM krijgen enkel de compacte basiself per match,
+    maar laden nog alle events en segmenten (die stap streamt niet).
+    """
+    lineups = None
+    if stream:
+        # 1+2) streaming: totalen, L5 en de basiself per match voor RAPM
+        agg = stream_player_totals(PLAYER_INPUT, load_calendar(), chunksize, last_n=5)
+        players, tot, l5 = agg["players"], agg["tot"], agg["l5"]
+        lineups = agg["lineups"]
+    else:
+        # 1) data inladen: de gedeelde sparse speler × match matrices (voor alle
+        #    aggregaties); RAPM leest de speler-matchrijen zelf (gecachet)
+        pmx = load_player_matrix(PLAYER_INPUT)
+        players = pmx["players"]
+
+        # 2) totalen en laatste 5 ploegwedstrijden = sparse rij-sommen
+        tot = player_totals(pmx)
+        l5 = player_totals(pmx, team_last_n(pmx, 5))
+
+    # 3) uitvoerkolom -> stat in de matrices
+    count_cols = {
+        "Selecties": "selected",
+        "Gestart": "started",
+        "Ingevallen": "sub_in",
+        "Vervangen": "sub_out",
+        "Speelminuten": "minutes",
+        "Goals": "goals",
+        "Penalties": "penalties",
+        "Own Goals": "own_goals",
+        "Geel": "yellow",
+        "Dubbelgeel": "yellow_red",
+        "Rood": "red",
+        "Clean sheets": "clean_sheet",
+        "Kapitein": "captain",
+    }
+    l5_cols = {
+        "Selecties L5": "selected",
+        "Gestart L5": "started",
+        "Ingevallen L5": "sub_in",
+        "Vervangen L5": "sub_out",
+        "Speelminuten L5": "minutes",
+        "Goals L5": "goals",
+        "Penalties L5": "penalties",
+        "Own goals L5": "own_goals",
+        "Geel L5": "yellow",
+        "Dubbelgeel L5": "yellow_red",
+        "Rood L5": "red",
+        "Clean sheet L5": "clean_sheet",
+        "Kapitein L5": "captain",
+    }
+
+    # per-90 en MVP gevectoriseerd
+    minutes = tot["minutes"].astype(int)
+    per90 = minutes / 90.0
+    mvp = (tot["mvp_pts"] / tot["mvp_min"]).where(tot["mvp_min"] > 0, 0.0)
+
+    # 4) kolomvolgorde zoals vroeger
+    out = pd.DataFrame({
+        "Team": players["Team"].to_numpy(),
+        "Speler": players["Player Name"].to_numpy(),
+        **{col: tot[stat].astype(int) for col, stat in count_cols.items()},
+        "Type": np.where(tot["keeper"] > 0, "Keeper", "Speler"),
+        "MVP p>20/90min": mvp.round(3),      # wordt later in JSON overschreven door RAPM
+        "Goals/90min": (tot["goals"].astype(int) / per90).where(minutes > 0, 0.0).round(3),
+        "Geel/90min": (tot["yellow"].astype(int) / per90).where(minutes > 0, 0.0).round(3),
+        # laatste 5
+        **{col: l5[stat].astype(int) for col, stat in l5_cols.items()},
+    })
 
     # 5) RAPM (totaal/offensief/defensief) per speler berekenen en toevoegen
+    #    (gekoppeld via (ploeg, speler)-ID, niet via naam)
+    reg = load_registry()
+    player_id = pd.Series(intern_players(reg, out["Team"], out["Speler"]), index=out.index)
+    save_registry(reg)
     try:
-        match_events = pd.read_csv(MATCH_EVENTS)
-        rapm_dict, seg_df = compute_rapm_from_logs(
-            df, match_events, split_off_def=True, return_segments=True
-        )
+        # gedeeld met de exporters via de schijfcache (zie load_rapm_segments)
+        rapm_dict, segs = load_rapm_segments(split_off_def=True, lineups=lineups)
         rapm_tot = rapm_dict.get("total", pd.Series(dtype=float))
         rapm_off = rapm_dict.get("off",   pd.Series(dtype=float))
         rapm_def = rapm_dict.get("def",   pd.Series(dtype=float))
@@ -976,7 +696,7 @@ def build_player_stats():
         rapm_z = rapm_dict.get("total_z", pd.Series(dtype=float))
 
         # 🔽 NIEUW: xPPM uit dezelfde segmenten
-        xppm_dict, _ = compute_xppm_from_segments(seg_df)
+        xppm_dict, _ = compute_xppm_from_segments(segs, factor=rapm_dict.get("paired_factor"))
 
         xppm_val = xppm_dict.get("xppm", pd.Series(dtype=float))
         xppm_se  = xppm_dict.get("se", pd.Series(dtype=float))
@@ -1001,22 +721,22 @@ def build_player_stats():
         xppm_z = pd.Series(dtype=float)
 
 
-    out["RAPM_per90"]       = out["Speler"].map(rapm_tot).round(3)
-    out["RAPM_off_per90"]   = out["Speler"].map(rapm_off).round(3)
-    out["RAPM_def_per90"]   = out["Speler"].map(rapm_def).round(3)
+    out["RAPM_per90"]       = player_id.map(rapm_tot).round(3)
+    out["RAPM_off_per90"]   = player_id.map(rapm_off).round(3)
+    out["RAPM_def_per90"]   = player_id.map(rapm_def).round(3)
 
     # nieuwe onzekerheidskolommen
-    out["RAPM_SE_per90"]    = out["Speler"].map(rapm_se).round(3)
-    out["RAPM_CI_low"]      = out["Speler"].map(rapm_ci_low).round(3)
-    out["RAPM_CI_high"]     = out["Speler"].map(rapm_ci_high).round(3)
-    out["RAPM_z"]           = out["Speler"].map(rapm_z).round(2)
+    out["RAPM_SE_per90"]    = player_id.map(rapm_se).round(3)
+    out["RAPM_CI_low"]      = player_id.map(rapm_ci_low).round(3)
+    out["RAPM_CI_high"]     = player_id.map(rapm_ci_high).round(3)
+    out["RAPM_z"]           = player_id.map(rapm_z).round(2)
 
     # 🔽 NIEUW: xPPM
-    out["xPPM_per90"]       = out["Speler"].map(xppm_val).round(3)
-    out["xPPM_SE"]          = out["Speler"].map(xppm_se).round(3)
-    out["xPPM_CI_low"]      = out["Speler"].map(xppm_ci_low).round(3)
-    out["xPPM_CI_high"]     = out["Speler"].map(xppm_ci_high).round(3)
-    out["xPPM_z"]           = out["Speler"].map(xppm_z).round(2)
+    out["xPPM_per90"]       = player_id.map(xppm_val).round(3)
+    out["xPPM_SE"]          = player_id.map(xppm_se).round(3)
+    out["xPPM_CI_low"]      = player_id.map(xppm_ci_low).round(3)
+    out["xPPM_CI_high"]     = player_id.map(xppm_ci_high).round(3)
+    out["xPPM_z"]           = player_id.map(xppm_z).round(2)
 
 
     # 6) wegschrijven
@@ -1025,4 +745,7 @@ def build_player_stats():
 
 
 if __name__ == "__main__":
-    build_player_stats()
+    if "--select-alpha" in sys.argv[1:]:
+        select_ridge_alphas()
+    else:
+        build_player_stats(stream="--stream" in sys.argv[1:])
@@ -0,0 +1,73 @@
+import json
+import sys
+
+import pandas as pd
+
+from pipeline_cache import cached
+
+CALENDAR_JSON = "data_raw/match_calendar.json"
+
+# -------------------------------------------------
+# 🇳🇱 Nederlandse maanden → maandnummer
+# -------------------------------------------------
+MONTH_MAP_NL = {
+    "JANUARI": 1,
+    "FEBRUARI": 2,
+    "MAART": 3,
+    "APRIL": 4,
+    "MEI": 5,
+    "JUNI": 6,
+    "JULI": 7,
+    "AUGUSTUS": 8,
+    "SEPTEMBER": 9,
+    "OKTOBER": 10,
+    "NOVEMBER": 11,
+    "DECEMBER": 12,
+}
+
+
+def parse_dutch_dates(values) -> pd.Series:
+    """
+    Gevectoriseerd: converteer datums zoals
+    'ZATERDAG, 30 AUGUSTUS 2025'
+    naar datetime64. Elke unieke string wordt maar één keer geparsed.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    s = pd.Series(uniques, dtype=object).astype(str).str.strip().str.upper()
+
+    # verwijder dag + komma, dan "30 AUGUSTUS 2025" opsplitsen
+    s = s.str.split(",", n=1).str[-1]
+    parts = s.str.extract(r"^\s*(\d{1,2})\s+([A-Z]+)\s+(\d{4})\s*$")
+    month = parts[1].map(MONTH_MAP_NL)
+
+    bad = parts[0].isna() | month.isna()
+    if bad.any():
+        raise ValueError(f"Onbekend datumformaat: {list(uniques[bad.to_numpy()][:5])}")
+
+    parsed = pd.to_datetime(pd.DataFrame({
+        "year": parts[2].astype(int),
+        "month": month.astype(int),
+        "day": parts[0].astype(int),
+    }))
+    return pd.Series(parsed.to_numpy()[codes], index=values.index if isinstance(values, pd.Series) else None)
+
+
+def parse_dutch_date(s: str) -> pd.Timestamp:
+    """Eén datum (compatibel met de oude rij-per-rij functie)."""
+    return parse_dutch_dates([s]).iloc[0]
+
+
+def load_calendar_table(path: str = CALENDAR_JSON) -> pd.DataFrame:
+    """
+    Volledige kalender (url, date, homeTeam, homeScore, awayTeam, awayScore)
+    met geparste datum. Gememoiseerd per inhoud van het bestand, zodat alle
+    stappen in een run dezelfde geparste fixture-tabel delen.
+    """
+    def build():
+        with open(path, "r", encoding="utf8") as f:
+            matches = json.load(f)
+        df = pd.DataFrame(matches)
+        df["date"] = parse_dutch_dates(df["date"])
+        return df
+
+    return cached("calendar", [path], build, code=[sys.modules[__name__]]).copy()
@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Array-gebaseerde ELO-engine
+# -------------------------------------------------
+# Ploegen krijgen een integer index, ratings zitten in een array van vorm
+# (n_params, n_teams). Zo lopen alle K / INITIAL_ELO varianten in één
+# pass over de kalender (broadcast over de parameter-as).
+
+def expected_score(elo_team, elo_opponent):
+    """Bereken verwacht resultaat via de ELO-formule (scalar of array)."""
+    return 1 / (1 + 10 ** ((elo_opponent - elo_team) / 400))
+
+
+# Draw-model zoals in de frontend (App.jsx): kans op gelijkspel daalt met het ELO-verschil
+DRAW_BASE = 0.30
+DRAW_SCALE = 400.0
+
+
+def fixture_probabilities(elo_home, elo_away, draw_base: float = DRAW_BASE, draw_scale: float = DRAW_SCALE):
+    """
+    (p_home, p_draw, p_away) met expected_score voor E en
+    p_draw = draw_base * exp(-|dElo| / draw_scale), p_home = (1 - p_draw) * E.
+    Werkt op scalars en (gebroadcaste) arrays.
+    """
+    elo_home = np.asarray(elo_home, dtype=float)
+    elo_away = np.asarray(elo_away, dtype=float)
+    E = expected_score(elo_home, elo_away)
+    p_draw = draw_base * np.exp(-np.abs(elo_home - elo_away) / draw_scale)
+    p_home = (1 - p_draw) * E
+    return p_home, p_draw, 1 - p_draw - p_home
+
+
+def g_factor(diff):
+    """G-factor precies zoals in de Excel-sheet: 1 bij verschil <= 1, anders (11 + diff) / 8."""
+    diff = np.asarray(diff, dtype=float)
+    return np.where(diff <= 1, 1.0, (11 + diff) / 8)
+
+
+def g_factor_wfe(diff):
+    """World Football Elo: 1 / 1.5 / (11 + diff) / 8 vanaf 3 goals verschil."""
+    diff = np.asarray(diff, dtype=float)
+    return np.select([diff <= 1, diff == 2], [1.0, 1.5], default=(11 + diff) / 8)
+
+
+def g_factor_log(diff):
+    """Logaritmisch: 1 + ln(diff) vanaf 1 goal verschil, 1 bij gelijkspel."""
+    diff = np.asarray(diff, dtype=float)
+    return 1.0 + np.log(np.maximum(diff, 1.0))
+
+
+def g_factor_none(diff):
+    """Geen marge-correctie: elke uitslag telt even zwaar."""
+    return np.ones_like(np.asarray(diff, dtype=float))
+
+
+# varianten voor backtesting (op naam, zodat ze picklebaar blijven)
+G_FACTORS = {
+    "sheet": g_factor,
+    "wfe": g_factor_wfe,
+    "log": g_factor_log,
+    "none": g_factor_none,
+}
+
+
+def index_teams(home, away, teams=None):
+    """
+    Geef (teams, home_idx, away_idx) terug.
+    teams is standaard de gesorteerde lijst van alle ploegen.
+    """
+    if teams is None:
+        teams = sorted(set(home).union(away))
+    index = pd.Index(teams)
+    home_idx = index.get_indexer(home)
+    away_idx = index.get_indexer(away)
+    if (home_idx < 0).any() or (away_idx < 0).any():
+        raise ValueError("Onbekende ploeg in kalender (niet in teams-lijst)")
+    return list(teams), home_idx, away_idx
+
+
+def match_outcomes(home_score, away_score, g_func=g_factor):
+    """
+    Vectoriseer scores naar (played, result_home, G).
+
+    - played:      bool-array, False voor toekomstige matchen
+    - result_home: 1 / 0.5 / 0, NaN voor toekomstige matchen
+    - G:           G-factor, 0 voor toekomstige matchen
+    """
+    hs = pd.to_numeric(pd.Series(home_score), errors="coerce").to_numpy(dtype=float)
+    as_ = pd.to_numeric(pd.Series(away_score), errors="coerce").to_numpy(dtype=float)
+    played = ~np.isnan(hs)
+
+    result_home = np.select([hs > as_, hs < as_], [1.0, 0.0], default=0.5)
+    result_home = np.where(played, result_home, np.nan)
+
+    diff = np.abs(np.where(played, hs - as_, 0.0))
+    G = np.where(played, g_func(diff), 0.0)
+    return played, result_home, G
+
+
+def run_elo(
+    home_idx,
+    away_idx,
+    result_home,
+    G,
+    n_teams: int,
+    k=30,
+    initial_elo=1500,
+    home_adv: float = 0.0,
+    ratings=None,
+):
+    """
+    Loop één keer chronologisch over de matchen voor alle parameter-sets tegelijk.
+
+    k en initial_elo mogen scalars of vectoren zijn (worden samen gebroadcast
+    naar de parameter-as). `ratings` (vorm (n_params, n_teams)) laat toe om
+    verder te rekenen vanaf een bestaande stand.
+
+    Returnt een dict met arrays van vorm (n_matches, n_params) voor
+    elo_*_before / expected_* / elo_*_after, plus de eindstand in "ratings".
+    """
+    k, initial_elo = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(k, dtype=float)),
+        np.atleast_1d(np.asarray(initial_elo, dtype=float)),
+    )
+    n_params = k.shape[0]
+
+    if ratings is None:
+        R = np.repeat(initial_elo[:, None], n_teams, axis=1)
+    else:
+        R = np.array(ratings, dtype=float).reshape(n_params, n_teams)
+
+    home_idx = np.asarray(home_idx)
+    away_idx = np.asarray(away_idx)
+    result_home = np.asarray(result_home, dtype=float)
+    result_away = 1 - result_home
+    played = ~np.isnan(result_home)
+
+    # K * G per match en per parameter-set
+    KG = k[None, :] * np.asarray(G, dtype=float)[:, None]
+
+    n = len(home_idx)
+    elo_home_before = np.empty((n, n_params))
+    elo_away_before = np.empty((n, n_params))
+    exp_home = np.empty((n, n_params))
+    exp_away = np.empty((n, n_params))
+    elo_home_after = np.empty((n, n_params))
+    elo_away_after = np.empty((n, n_params))
+
+    for i in range(n):
+        h = home_idx[i]
+        a = away_idx[i]
+        eh = R[:, h].copy()
+        ea = R[:, a].copy()
+
+        e_h = expected_score(eh + home_adv, ea)
+        e_a = expected_score(ea, eh + home_adv)
+
+        elo_home_before[i] = eh
+        elo_away_before[i] = ea
+        exp_home[i] = e_h
+        exp_away[i] = e_a
+
+        if played[i]:
+            R[:, h] = eh + KG[i] * (result_home[i] - e_h)
+            R[:, a] = ea + KG[i] * (result_away[i] - e_a)
+
+        elo_home_after[i] = R[:, h]
+        elo_away_after[i] = R[:, a]
+
+    return {
+        "elo_home_before": elo_home_before,
+        "elo_away_before": elo_away_before,
+        "expected_home": exp_home,
+        "expected_away": exp_away,
+        "elo_home_after": elo_home_after,
+        "elo_away_after": elo_away_after,
+        "ratings": R,
+    }
+
+
+# -------------------------------------------------
+# Meerdere seizoenen aan elkaar rijgen
+# -------------------------------------------------
+def seed_ratings(prev_teams, prev_ratings, teams, shrink: float, new_team_elo):
+    """
+    Startratings voor een nieuw seizoen uit de eindstand van het vorige.
+
+    - bestaande ploegen: mean + (1 - shrink) * (rating - mean), per parameter-set
+    - nieuwe / gepromoveerde ploegen: new_team_elo
+    Vorm in en uit: (n_params, n_teams).
+    """
+    prev_ratings = np.atleast_2d(np.asarray(prev_ratings, dtype=float))
+    mean = prev_ratings.mean(axis=1, keepdims=True)
+
+    idx = pd.Index(prev_teams).get_indexer(teams)
+    known = idx >= 0
+    carried = mean + (1 - shrink) * (prev_ratings[:, np.where(known, idx, 0)] - mean)
+
+    new = np.broadcast_to(np.asarray(new_team_elo, dtype=float).reshape(-1, 1), carried.shape)
+    return np.where(known[None, :], carried, new)
+
+
+def chain_seasons(
+    seasons,
+    k=30,
+    initial_elo=1500,
+    shrink: float = 0.33,
+    new_team_elo=1500,
+    home_adv: float = 0.0,
+    g_func=g_factor,
+):
+    """
+    Loop seizoen per seizoen door een iterable van fixture-tabellen
+    (date, homeTeam, awayTeam, homeScore, awayScore) — mag een generator zijn,
+    zodat er telkens maar één seizoen in geheugen zit.
+
+    Het eerste seizoen start op initial_elo, elk volgend seizoen op de
+    geshrinkte eindstand van het vorige (zie seed_ratings).
+
+    Yield per seizoen: (df, teams, played, result_home, G, run).
+    """
+    prev = None  # (teams, ratings) van vorig seizoen
+
+    for df in seasons:
+        teams, home_idx, away_idx = index_teams(df["homeTeam"], df["awayTeam"])
+        played, result_home, G = match_outcomes(df["homeScore"], df["awayScore"], g_func=g_func)
+
+        ratings = None
+        if prev is not None:
+            ratings = seed_ratings(prev[0], prev[1], teams, shrink, new_team_elo)
+
+        run = run_elo(
+            home_idx, away_idx, result_home, G, len(teams),
+            k=k, initial_elo=initial_elo, home_adv=home_adv, ratings=ratings,
+        )
+        yield df, teams, played, result_home, G, run
+
+        prev = (teams, run["ratings"])
@@ -0,0 +1,96 @@
+import sys
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+from pipeline_cache import cached
+
+MATCH_EVENTS_PATH = "data_raw/match_events.csv"
+DATA_MATCHEVENT_PATH = "data_raw/data_matchevent.csv"
+
+
+# -------------------------------------------------
+# Event-codes (één keer genormaliseerd per eventbestand)
+# -------------------------------------------------
+class EventCode(IntEnum):
+    OTHER = 0
+    GOAL = 1
+    PENALTY = 2
+    OWN_GOAL = 3
+    YELLOW = 4
+    YELLOW_RED = 5
+    RED = 6
+    SUB_IN = 7
+    SUB_OUT = 8
+
+
+# eventtekst (lowercase, gestript) -> code
+EVENT_TEXT_CODES = {
+    "goal": EventCode.GOAL,
+    "penalty": EventCode.PENALTY,
+    "own goal": EventCode.OWN_GOAL,
+    "yellow card": EventCode.YELLOW,
+    "yellow": EventCode.YELLOW,
+    "yellowcard": EventCode.YELLOW,
+    "gele kaart": EventCode.YELLOW,
+    "geel": EventCode.YELLOW,
+    "yellow-red card": EventCode.YELLOW_RED,
+    "yellow card - red card": EventCode.YELLOW_RED,
+    "red card": EventCode.RED,
+}
+
+GOAL_CODES = (EventCode.GOAL, EventCode.PENALTY, EventCode.OWN_GOAL)
+SENDING_OFF_CODES = (EventCode.YELLOW_RED, EventCode.RED)
+SUB_CODES = (EventCode.SUB_IN, EventCode.SUB_OUT)
+
+TEAM_COLUMNS = ["home_team", "away_team", "team", "team_against", "team against"]
+
+
+def parse_minutes(values) -> pd.Series:
+    """
+    Gevectoriseerd: '31' → 31, '45+2' → 47, "90'" → 90.
+    Onleesbare waarden worden NaN (geen clamp; zie normalize_events voor mnum).
+    """
+    s = pd.Series(values).astype("string")
+    parts = s.str.extract(r"(\d+)(?:\s*\+\s*(\d+))?")
+    base = pd.to_numeric(parts[0], errors="coerce")
+    extra = pd.to_numeric(parts[1], errors="coerce").fillna(0)
+    return (base + extra).astype(float)
+
+
+def event_codes(values) -> np.ndarray:
+    """Eventtekst → EventCode (int8); wissels herkend op 'substitute in/out' in de tekst."""
+    ev = pd.Series(values).astype("string").str.strip().str.lower()
+    codes = ev.map(EVENT_TEXT_CODES).astype("float").fillna(EventCode.OTHER)
+    codes = codes.mask(ev.str.contains("substitute in", regex=False, na=False), EventCode.SUB_IN)
+    codes = codes.mask(ev.str.contains("substitute out", regex=False, na=False), EventCode.SUB_OUT)
+    return codes.to_numpy(dtype=np.int8)
+
+
+def normalize_events(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Voegt getypeerde kolommen toe aan een eventtabel (match_events.csv of
+    data_matchevent.csv):
+
+    - minute_abs: minuut incl. blessuretijd (45+2 → 47), NaN als onleesbaar
+    - mnum:       idem, geclampt op 0..90 (voor tijdvakken in de exporters)
+    - code:       EventCode (int8)
+    - ploegnamen als categoricals
+    """
+    df = df.copy()
+    df["minute_abs"] = parse_minutes(df["minute"]).to_numpy()
+    df["mnum"] = df["minute_abs"].clip(0, 90)
+    df["code"] = event_codes(df["event"])
+    for col in TEAM_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def load_events(path: str = MATCH_EVENTS_PATH) -> pd.DataFrame:
+    """Genormaliseerde eventtabel, één keer per inhoud van het bestand (gememoiseerd)."""
+    return cached(
+        "events", [path], lambda: normalize_events(pd.read_csv(path)),
+        code=[sys.modules[__name__]],
+    ).copy()
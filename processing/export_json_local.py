@@ -1,16 +1,28 @@
 import sys, json
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import os
 import shutil
 
 from build_player_stats import (
-    compute_rapm_from_logs,
+    load_rapm_segments,
     PLAYER_INPUT,
-    MATCH_EVENTS,
     load_calendar,
 )
+from team_matches import build_team_matches, load_team_matches
+from form import compute_form, empty_form
+from elo_engine import fixture_probabilities
+from schedule import schedule_difficulty
+from events import EventCode, GOAL_CODES, load_events
+from ids import load_registry, player_names
+from player_matrix import load_player_matchdata, load_player_matrix, player_totals
+from dutch_dates import CALENDAR_JSON, load_calendar_table
+from segments import segment_frame
+from timeline import build_player_timeline
+from streaks import TEAM_STREAKS, player_streaks, team_streaks
+from asof import PLAYER_ASOF_STATS, TEAM_ASOF_STATS, build_asof_index
 
 # =========================== GOOGLE SHEETS (CSV) ============================
 
@@ -66,6 +78,12 @@ def _read_csv(gid: str | int, usecols=None):
     return pd.read_csv(path, usecols=usecols)
 
 
+def _load_matchevents(columns: list[str]) -> pd.DataFrame:
+    """Data Matchevent, genormaliseerd (mnum, code, categoricals) via events.load_events."""
+    dm = load_events(LOCAL_MAP[GID_DATA_MATCHEVENT])
+    return dm[columns + ["minute_abs", "mnum", "code"]]
+
+
 
 
 
@@ -159,7 +177,44 @@ def export_team_stats(xfile: str, dst: Path):
 
     df["ELO"] = df["ELO"].round(1)
 
-    _minidump(df.to_dict(orient="records"), dst)
+    # Vorm over meerdere vensters (L3/L5/L10 + EWM), vast schema per team
+    tm = load_team_matches()
+    form = compute_form(tm)
+    streaks = team_streaks(tm)
+    no_streak = {name: {"current": 0, "longest": 0} for name in TEAM_STREAKS}
+    records = df.to_dict(orient="records")
+    for rec in records:
+        rec["form"] = form.get(rec["Team"], empty_form())
+        rec["streaks"] = streaks.get(rec["Team"], no_streak)
+
+    _minidump(records, dst)
+
+def export_fixture_probs(xfile: str, dst: Path):
+    """
+    Dense team×team matrix met winst/gelijk/verlies-kansen (rij = thuisploeg,
+    kolom = uitploeg) op basis van de huidige ELO uit team_stats.csv.
+    Eén NumPy-broadcast; zelfde formule als de simulaties in App.jsx.
+    """
+    ts = _read_csv(GID_TEAM_STATS, usecols=["Team", "Current ELO"])
+    ts = ts[ts["Team"].isin(ALLOWED)].sort_values("Team")
+
+    teams = ts["Team"].tolist()
+    elo = pd.to_numeric(ts["Current ELO"], errors="coerce").fillna(1500.0).to_numpy(dtype=float)
+
+    p_home, p_draw, p_away = fixture_probabilities(elo[:, None], elo[None, :])
+
+    # diagonaal (ploeg tegen zichzelf) bestaat niet
+    for m in (p_home, p_draw, p_away):
+        np.fill_diagonal(m, 0.0)
+
+    out = {
+        "teams": teams,
+        "elo": [round(float(e), 2) for e in elo],
+        "home": np.round(p_home, 4).tolist(),
+        "draw": np.round(p_draw, 4).tolist(),
+        "away": np.round(p_away, 4).tolist(),
+    }
+    _minidump(out, dst)
 
 # ================================= H2H ======================================
 
@@ -206,32 +261,32 @@ def export_h2h_all(xfile: str, dst: Path):
     _minidump(data, dst)
 
 def export_homeaway_all(xfile: str, dst: Path):
-    dt = _read_csv(GID_DATA_TEAM)
-    played = dt[pd.notna(dt.homeScore) & pd.notna(dt.awayScore)].copy()
-    played["homeScore"] = pd.to_numeric(played["homeScore"], errors="coerce").astype(int)
-    played["awayScore"] = pd.to_numeric(played["awayScore"], errors="coerce").astype(int)
+    tm = load_team_matches()
+
+    # één grouped pass over het team-perspectief (team × thuis/uit)
+    tm = tm.assign(
+        W=(tm["result"] == 1.0).astype(int),
+        G=(tm["result"] == 0.5).astype(int),
+        V=(tm["result"] == 0.0).astype(int),
+    )
+    agg = tm.groupby(["team", "is_home"]).agg(
+        matches=("team", "size"),
+        W=("W", "sum"),
+        G=("G", "sum"),
+        V=("V", "sum"),
+        points=("points", "sum"),
+        GF=("goals_for", "sum"),
+        GA=("goals_against", "sum"),
+    )
+    rows = {key: {k: int(v) for k, v in rec.items()} for key, rec in agg.to_dict(orient="index").items()}
 
-    teams = sorted(set(played["homeTeam"]).union(played["awayTeam"]))
+    empty = {"matches": 0, "W": 0, "G": 0, "V": 0, "points": 0, "GF": 0, "GA": 0}
+    teams = sorted(tm["team"].unique())
     out = {t: {
-        "home": {"matches": 0, "W": 0, "G": 0, "V": 0, "points": 0, "GF": 0, "GA": 0},
-        "away": {"matches": 0, "W": 0, "G": 0, "V": 0, "points": 0, "GF": 0, "GA": 0}
+        "home": rows.get((t, 1), dict(empty)),
+        "away": rows.get((t, 0), dict(empty)),
     } for t in teams}
 
-    for _, r in played.iterrows():
-        h, a, hs, as_ = r.homeTeam, r.awayTeam, int(r.homeScore), int(r.awayScore)
-
-        if h in out:
-            o = out[h]["home"]; o["matches"] += 1; o["GF"] += hs; o["GA"] += as_
-            if hs > as_: o["W"] += 1; o["points"] += 3
-            elif hs == as_: o["G"] += 1; o["points"] += 1
-            else: o["V"] += 1
-
-        if a in out:
-            o = out[a]["away"]; o["matches"] += 1; o["GF"] += as_; o["GA"] += hs
-            if as_ > hs: o["W"] += 1; o["points"] += 3
-            elif as_ == hs: o["G"] += 1; o["points"] += 1
-            else: o["V"] += 1
-
     _minidump(out, dst)
 
 
@@ -307,26 +362,10 @@ def _league_stats_from_teamstats(ts: pd.DataFrame) -> dict:
 def export_event_bins_all(xfile: str, dst: Path):
     import statistics
 
-    dm = _read_csv(
-        GID_DATA_MATCHEVENT,
-        usecols=["team", "team against", "minute", "event", "Goal total event"],
-    ).rename(columns={"team against": "opp", "Goal total event": "goal_flag"})
+    dm = _load_matchevents(["team", "team against"]).rename(columns={"team against": "opp"})
 
-    def parse_minute(x):
-        if pd.isna(x):
-            return pd.NA
-        import re
-
-        m = re.match(r".*?(\d+)(?:\s*\+\s*(\d+))?.*", str(x))
-        if not m:
-            return pd.NA
-        v = int(m.group(1)) + (int(m.group(2)) if m.group(2) else 0)
-        return float(90 if v > 90 else (0 if v < 0 else v))
-
-    dm["mnum"] = dm["minute"].map(parse_minute)
-    ev = dm["event"].astype(str).str.lower().str.strip()
-    is_yellow = ev.isin({"yellow", "yellowcard", "gele kaart", "geel", "yellow card"})
-    is_goal = dm["goal_flag"].astype(bool)
+    is_yellow = dm["code"] == EventCode.YELLOW
+    is_goal = dm["code"].isin(GOAL_CODES)
 
     def bins(s):
         s = pd.to_numeric(s, errors="coerce").dropna().astype(float)
@@ -462,36 +501,16 @@ def export_first_scorer_all(xfile: str, dst: Path):
       - resultaten (W/D/L + %) wanneer team eerst scoort
       - resultaten (W/D/L + %) wanneer tegenstander eerst scoort
     """
-    dm = _read_csv(
-        GID_DATA_MATCHEVENT,
-        usecols=[
-            "matchurl",
-            "home_team",
-            "away_team",
-            "event",
-            "team",
-            "minute",
-            "home_team_goals",
-            "away_team_goals",
-            "team against",
-            "Goal total event",
-        ],
-    ).rename(columns={"team against": "opp", "Goal total event": "goal_flag"})
-
-    # minuut parser (45+2 → 47, max 90, min 0)
-    def parse_minute(x):
-        if pd.isna(x):
-            return pd.NA
-        import re
-
-        m = re.match(r".*?(\d+)(?:\s*\+\s*(\d+))?.*", str(x))
-        if not m:
-            return pd.NA
-        v = int(m.group(1)) + (int(m.group(2)) if m.group(2) else 0)
-        return float(90 if v > 90 else (0 if v < 0 else v))
-
-    dm["mnum"] = dm["minute"].map(parse_minute)
-    dm["goal_flag"] = dm["goal_flag"].fillna(0).astype(int)
+    dm = _load_matchevents([
+        "matchurl",
+        "home_team",
+        "away_team",
+        "team",
+        "home_team_goals",
+        "away_team_goals",
+        "team against",
+    ]).rename(columns={"team against": "opp"})
+    dm["goal_flag"] = dm["code"].isin(GOAL_CODES).astype(int)
 
     # init per team
     stats: dict[str, dict] = {}
@@ -638,30 +657,13 @@ def export_halftime_fulltime_all(xfile: str, dst: Path):
       - aantal gespeelde matchen
       - aantallen per HT/FT-scenario (W/D/L aan rust vs W/D/L op fulltime)
     """
-    dm = _read_csv(
-        GID_DATA_MATCHEVENT,
-        usecols=[
-            "matchurl",
-            "home_team",
-            "away_team",
-            "minute",
-            "home_team_goals",
-            "away_team_goals",
-        ],
-    )
-
-    def parse_minute(x):
-        if pd.isna(x):
-            return pd.NA
-        import re
-
-        m = re.match(r".*?(\d+)(?:\s*\+\s*(\d+))?.*", str(x))
-        if not m:
-            return pd.NA
-        v = int(m.group(1)) + (int(m.group(2)) if m.group(2) else 0)
-        return float(90 if v > 90 else (0 if v < 0 else v))
-
-    dm["mnum"] = dm["minute"].map(parse_minute)
+    dm = _load_matchevents([
+        "matchurl",
+        "home_team",
+        "away_team",
+        "home_team_goals",
+        "away_team_goals",
+    ])
 
     out: dict[str, dict] = {}
     for t in ALLOWED:
@@ -737,35 +739,14 @@ def export_halftime_fulltime_all(xfile: str, dst: Path):
 
 
 def export_substitution_stats_all(xfile: str, dst: Path):
-    dm = _read_csv(
-        GID_DATA_MATCHEVENT,
-        usecols=[
-            "matchurl",
-            "home_team",
-            "away_team",
-            "team",
-            "event",
-            "minute",
-            "home_team_goals",
-            "away_team_goals",
-        ],
-    )
-
-    def parse_minute(x):
-        if pd.isna(x):
-            return pd.NA
-        import re
-
-        m = re.match(r".*?(\d+)(?:\s*\+\s*(\d+))?.*", str(x))
-        if not m:
-            return pd.NA
-        v = int(m.group(1)) + (int(m.group(2)) if m.group(2) else 0)
-        return float(90 if v > 90 else (0 if v < 0 else v))
-
-    dm["mnum"] = dm["minute"].map(parse_minute)
-    dm["event_l"] = dm["event"].astype(str).str.lower().str.strip()
-
-    goal_events = {"goal", "penalty", "own goal"}
+    dm = _load_matchevents([
+        "matchurl",
+        "home_team",
+        "away_team",
+        "team",
+        "home_team_goals",
+        "away_team_goals",
+    ])
 
     def team_gd(row, team_name: str) -> int:
         scoring_team = str(row.get("team", ""))
@@ -785,7 +766,7 @@ def export_substitution_stats_all(xfile: str, dst: Path):
     league_timing = {"0-60": 0, "61-75": 0, "76-90": 0}
 
     for match_id, grp in dm.groupby("matchurl"):
-        grp = grp.sort_values(["mnum", "event_l"], na_position="last").copy()
+        grp = grp.sort_values(["mnum", "code"], na_position="last").copy()
         if grp.empty:
             continue
 
@@ -795,11 +776,11 @@ def export_substitution_stats_all(xfile: str, dst: Path):
             if t in per_team:
                 per_team[t]["matches"].add(match_id)
 
-        subs = grp[grp["event_l"] == "substitute in"].copy()
+        subs = grp[grp["code"] == EventCode.SUB_IN].copy()
         if subs.empty:
             continue
 
-        goals = grp[grp["event_l"].isin(goal_events)].copy()
+        goals = grp[grp["code"].isin(GOAL_CODES)].copy()
 
         for _, sub in subs.iterrows():
             team_name = str(sub["team"])
@@ -1047,13 +1028,32 @@ def export_player_stats_all(xfile: str, dst: Path):
     else:
         work = work.sort_values(["Team"], ascending=[True])
 
-    # output: dict[team] -> lijst spelers
+    # output: dict[team] -> lijst spelers (+ lopende/langste reeksen)
+    streaks = player_streaks(load_player_matrix(PLAYER_INPUT))
+    no_streak = {"scored": {"current": 0, "longest": 0}, "started": {"current": 0, "longest": 0}}
     out = {}
     for team, g in work.groupby("Team"):
         out[team] = g.drop(columns=["Team"]).to_dict(orient="records")
+        for rec in out[team]:
+            rec["streaks"] = streaks.get((team, rec["Speler"]), no_streak)
 
     _minidump(out, dst)
 
+# ===================== PLAYER TIMELINE =========================
+
+def export_player_timeline(xfile: str, dst: Path):
+    """
+    Match-per-match reeksen per speler (vormcurve in de app), zie timeline.py.
+    Kolomsgewijs per ploeg: speler i = rijen offsets[i]..offsets[i+1]-1 van
+    m/min/goals/pens/yc/rc/start/subIn/subOut/pm; "m" verwijst naar de
+    matchtabel van de ploeg (date, md = speeldag, opp, home, res). "pm" = doelpuntensaldo
+    van de ploeg terwijl de speler op het veld stond (uit de RAPM-segmenten).
+    """
+    pm = load_player_matchdata(PLAYER_INPUT)
+    _, segs = load_rapm_segments()
+    timeline = build_player_timeline(pm, load_calendar_table(CALENDAR_JSON), segs)
+    _minidump({team: timeline[team] for team in ALLOWED if team in timeline}, dst)
+
 # ===================== RAPM segments =========================
 
 def export_rapm_segments_all(xfile: str, dst: Path):
@@ -1068,29 +1068,19 @@ def export_rapm_segments_all(xfile: str, dst: Path):
           * lijst spelers van dat team die op het veld stonden
     JSON-bestand: public/data/team_rapm_segments.json
     """
-    # --- player_matchdata inladen + booleans normaliseren zoals in build_player_stats ---
-    pm = pd.read_csv(PLAYER_INPUT)
-
-    def to_bool(s):
-        return str(s).strip().lower() in ("true", "1", "yes")
-
-    for col in ["Starting Player", "Substituted In", "Substituted Out",
-                "Is Goalkeeper", "Is Captain", "Clean Sheet"]:
-        if col in pm.columns:
-            pm[col] = pm[col].apply(to_bool)
-        else:
-            pm[col] = False
-
-    me = pd.read_csv(MATCH_EVENTS)
+    # RAPM + segmenten (spelers als ID; namen pas hier bij de export),
+    # uit de schijfcache van build_player_stats zolang de bronbestanden niet wijzigen
+    rapm_res, segs = load_rapm_segments()
+    rapm = rapm_res.get("total", pd.Series(dtype=float))
+    names = player_names(load_registry())
 
-    # RAPM + ruwe segmenten
-    rapm, seg_df = compute_rapm_from_logs(pm, me, return_segments=True)
-
-    if seg_df is None or seg_df.empty:
+    if not len(segs["seg"]):
         _minidump({}, dst)
         return
 
-    # datum bij de segmenten (via kalender)
+    # datum bij de segmenten (via kalender); "k" = index in segs (line-upbuffer)
+    seg_df = segment_frame(segs)
+    seg_df["k"] = np.arange(len(seg_df))
     cal = load_calendar()  # kolommen: url, date
     seg_df = seg_df.merge(
         cal.rename(columns={"url": "match"}),
@@ -1100,34 +1090,36 @@ def export_rapm_segments_all(xfile: str, dst: Path):
     seg_df["date"] = pd.to_datetime(seg_df["date"], errors="coerce")
     seg_df = seg_df.sort_values(["date", "match"], kind="stable").reset_index(drop=True)
 
+    ptr, lineup = segs["lineup_ptr"], segs["lineup"]
     out: dict[str, dict] = {}
 
     for team in ALLOWED:
-        rows = seg_df[(seg_df["home"] == team) | (seg_df["away"] == team)].copy()
+        rows = seg_df[(seg_df["home"] == team) | (seg_df["away"] == team)]
         if rows.empty:
             continue
 
         segments_json = []
-        team_players: set[str] = set()
-
-        for _, r in rows.iterrows():
-            is_home = (r["home"] == team)
-            gd_team = float(r["gd_delta"]) if is_home else float(-r["gd_delta"])
-            players_on = list(r["home_players"] if is_home else r["away_players"])
-            dt = r.get("date")
+        team_players: set[int] = set()
+
+        for r in rows.itertuples(index=False):
+            is_home = (r.home == team)
+            gd_team = float(r.gd_delta) if is_home else float(-r.gd_delta)
+            side = 2 * r.k + (0 if is_home else 1)
+            players_on = lineup[ptr[side]:ptr[side + 1]].tolist()
+            dt = r.date
             date_str = (
                 dt.strftime("%Y-%m-%d")
                 if isinstance(dt, pd.Timestamp) and pd.notna(dt)
                 else None
             )
-            opp = str(r["away"] if is_home else r["home"])
+            opp = str(r.away if is_home else r.home)
 
             segments_json.append({
-                "match": str(r["match"]),
+                "match": str(r.match),
                 "date": date_str,
                 "gd": gd_team,
-                "duration": int(r["duration"]),
-                "players": players_on,
+                "duration": int(r.duration),
+                "players": [names[p] for p in players_on],
                 "opp": opp,
                 "isHome": bool(is_home),
             })
@@ -1141,7 +1133,7 @@ def export_rapm_segments_all(xfile: str, dst: Path):
             reverse=True,
         )
         players_json = [
-            {"name": p, "rapm_per90": float(rapm.get(p, 0.0))}
+            {"name": names[p], "rapm_per90": float(rapm.get(p, 0.0))}
             for p in players_list
         ]
 
@@ -1159,51 +1151,32 @@ def export_rapm_segments_all(xfile: str, dst: Path):
 def export_points_series(xfile: str, dst: Path):
     """
     Bouwt per team de cumulatieve puntenreeks per speeldag (ALLEEN huidig seizoen).
-    Bron: data_raw/data_team.csv via GID_DATA_TEAM.
+    Bron: team-perspectief uit data_team.csv (zie team_matches.load_team_matches).
     'prev' blijft leeg zolang we geen vorig seizoen hebben.
     """
     def calc_series(df: pd.DataFrame) -> dict:
         if df is None or df.empty:
             return {}
-        need = ["date", "homeTeam", "homeScore", "awayTeam", "awayScore"]
-        missing = [c for c in need if c not in df.columns]
-        if missing:
-            return {}
-
-        d = df.copy()
-        d["date"] = pd.to_datetime(d["date"], errors="coerce", dayfirst=True)
-        d = d[pd.notna(d["homeScore"]) & pd.notna(d["awayScore"])].sort_values("date", kind="stable")
-        d["homeScore"] = pd.to_numeric(d["homeScore"], errors="coerce")
-        d["awayScore"] = pd.to_numeric(d["awayScore"], errors="coerce")
-
-        rows = []
-        for _, r in d.iterrows():
-            hs, as_ = int(r["homeScore"]), int(r["awayScore"])
-            if hs > as_:
-                ph, pa = 3, 0
-            elif hs == as_:
-                ph, pa = 1, 1
-            else:
-                ph, pa = 0, 3
-            rows.append((r["date"], r["homeTeam"], ph))
-            rows.append((r["date"], r["awayTeam"], pa))
-
-        if not rows:
+        s = df
+        if "goals_for" not in s.columns:
+            need = ["date", "homeTeam", "homeScore", "awayTeam", "awayScore"]
+            missing = [c for c in need if c not in s.columns]
+            if missing:
+                return {}
+            s = build_team_matches(s)
+        if s.empty:
             return {}
-        s = pd.DataFrame(rows, columns=["date", "team", "pts"]).sort_values(["team", "date"], kind="stable")
+        s = s.assign(cum=s.groupby("team")["points"].cumsum().astype(int))
 
         out = {}
         for team, g in s.groupby("team"):
             if team not in ALLOWED:
                 continue
-            g = g.reset_index(drop=True)
-            g["cum"] = g["pts"].cumsum().astype(int)
-            rounds = list(range(1, len(g) + 1))
-            out[team] = {"rounds": rounds, "cum": g["cum"].tolist()}
+            out[team] = {"rounds": g["round"].tolist(), "cum": g["cum"].tolist()}
         return out
 
-    # Huidig seizoen uit data_team.csv
-    cur_map = calc_series(_read_csv(GID_DATA_TEAM))
+    # Huidig seizoen uit het team-perspectief (team_matches.load_team_matches)
+    cur_map = calc_series(load_team_matches())
 
     # Optioneel: vorig seizoen uit data_team_prev.csv
     try:
@@ -1223,6 +1196,123 @@ def export_points_series(xfile: str, dst: Path):
 
     _minidump(out, dst)
 
+# ========================= STANDINGS HISTORY ================================
+
+def export_standings_history(xfile: str, dst: Path):
+    """
+    Klassement na elke speeldag uit de kalender (zie
+    team_matches.fixture_matchdays): alle matchen gespeeld vóór de volgende
+    speeldag begint, dus uitgestelde matchen tellen pas mee op hun echte datum
+    ("played" toont dan een match minder). Sortering zoals build_team_stats
+    stap 7: Points, Goal Diff, Goals For (aflopend), daarna teamnaam.
+
+    Compact formaat: elke reeks is een rounds × teams matrix
+    (rij = speeldag, kolom = index in "teams").
+    """
+    tm = load_team_matches()
+    tm = tm[tm["team"].isin(ALLOWED)]
+    if tm.empty:
+        _minidump({"teams": [], "rounds": []}, dst)
+        return
+
+    teams = sorted(tm["team"].unique())
+    n_teams = len(teams)
+    n_rounds = int(tm["matchday"].max())
+
+    t_idx = pd.Index(teams).get_indexer(tm["team"])
+    r_idx = tm["matchday"].to_numpy(dtype=int) - 1
+
+    def cumulative(values) -> np.ndarray:
+        m = np.zeros((n_rounds, n_teams), dtype=np.int64)
+        np.add.at(m, (r_idx, t_idx), values)   # inhaalmatch + gewone match op één speeldag
+        return np.cumsum(m, axis=0)   # lege cellen (geen match) dragen de vorige stand mee
+
+    pts = cumulative(tm["points"].to_numpy(dtype=int))
+    gd = cumulative(tm["goal_diff"].to_numpy(dtype=int))
+    gf = cumulative(tm["goals_for"].to_numpy(dtype=int))
+    played = cumulative(np.ones(len(tm), dtype=int))
+
+    # één lexsort over alle (speeldag, ploeg)-cellen; speeldag is de primaire sleutel
+    rounds = np.repeat(np.arange(n_rounds), n_teams)
+    team_col = np.tile(np.arange(n_teams), n_rounds)
+    order = np.lexsort((team_col, -gf.ravel(), -gd.ravel(), -pts.ravel(), rounds))
+    pos = np.empty(n_rounds * n_teams, dtype=int)
+    pos[order] = np.tile(np.arange(1, n_teams + 1), n_rounds)
+
+    out = {
+        "teams": teams,
+        "rounds": list(range(1, n_rounds + 1)),
+        "pos": pos.reshape(n_rounds, n_teams).tolist(),
+        "pts": pts.tolist(),
+        "gd": gd.tolist(),
+        "gf": gf.tolist(),
+        "played": played.tolist(),
+    }
+    _minidump(out, dst)
+
+def export_schedule_difficulty(xfile: str, dst: Path):
+    """
+    Moeilijkheid resterend programma na elke speeldag (speeldag 0 = seizoensstart),
+    zie schedule.schedule_difficulty. Compact formaat: rounds × teams matrices;
+    null waar een ploeg geen resterende (thuis/uit)matchen meer heeft.
+    """
+    dt = _read_csv(GID_DATA_TEAM)
+    teams = sorted(set(dt["homeTeam"]).union(dt["awayTeam"]) & set(ALLOWED))
+    if not teams:
+        _minidump({"teams": [], "rounds": []}, dst)
+        return
+
+    sd = schedule_difficulty(dt, teams=teams)
+
+    def matrix(m, nd=2):
+        m = np.round(np.asarray(m, dtype=float), nd)
+        return [[None if np.isnan(v) else float(v) for v in row] for row in m]
+
+    out = {
+        "teams": sd["teams"],
+        "rounds": sd["rounds"],
+        "rating": matrix(sd["rating"]),
+        "oppH": matrix(sd["opp_h"]),
+        "oppA": matrix(sd["opp_a"]),
+        "oppTotal": matrix(sd["opp_total"]),
+        "remaining": sd["remaining"].tolist(),
+        "xPts": matrix(sd["xpts"]),
+        "pct": matrix(sd["pct"], 1),
+        "leagueAvg": [round(float(v), 2) for v in sd["league_avg"]],
+    }
+    _minidump(out, dst)
+
+def export_asof_index(xfile: str, dst: Path):
+    """
+    Cumulatieve sommen per speeldag (zie asof.py) voor een speeldag-/datumslider
+    in de app: som over speeldag a..b = cum[b] - cum[a - 1], zonder herberekening.
+
+    Compact formaat: per stat een matrix (rij = ploeg of speler, kolom = speeldag
+    0..n, met een nul vooraan); "dates" geeft de laatste speeldatum van elke speeldag.
+    """
+    asof = build_asof_index()
+    ti, pi = asof["team"], asof["player"]
+
+    t_keep = [i for i, t in enumerate(ti["teams"]) if t in ALLOWED]
+    p_team = np.asarray(pi["teams"], dtype=object)[pi["player_team"]]
+    p_keep = np.flatnonzero(pd.Series(p_team).isin(ALLOWED).to_numpy())
+
+    teams = [ti["teams"][i] for i in t_keep]
+    dates = pd.Series(ti["dates"]).dt.strftime("%Y-%m-%d")
+
+    out = {
+        "rounds": ti["n_rounds"],
+        "teams": teams,
+        "dates": dates.astype(object).where(dates.notna(), None).tolist(),
+        "team": {s: ti["C"][s][t_keep].astype(int).tolist() for s in TEAM_ASOF_STATS},
+        "players": {
+            "name": pi["players"]["Player Name"].iloc[p_keep].tolist(),
+            "team": pd.Index(teams).get_indexer(p_team[p_keep]).tolist(),
+            **{s: pi["C"][s][p_keep].astype(int).tolist() for s in PLAYER_ASOF_STATS},
+        },
+    }
+    _minidump(out, dst)
+
 # ================================== ELO =====================================
 
 def export_elo_series(xfile: str, out_file: Path):
@@ -1241,25 +1331,7 @@ def export_elo_series(xfile: str, out_file: Path):
                 return hit
         return None
 
-    dt = _read_csv(GID_DATA_TEAM)
-    needed = ["date", "homeTeam", "homeScore", "awayTeam", "awayScore"]
-    miss = [c for c in needed if c not in dt.columns]
-    if miss:
-        raise RuntimeError(f"Ontbrekende kolommen in 'Data Team': {miss}")
-
-    # Per-match ELO (optioneel)
-    ELOH = "elo_home_before"
-    ELOA = "elo_away_before"
-
-
-
-    d = dt.copy()
-    d["date"] = pd.to_datetime(d["date"], errors="coerce", dayfirst=True)
-    d = d[pd.notna(d["homeScore"]) & pd.notna(d["awayScore"])].sort_values("date", kind="stable")
-    d["homeScore"] = pd.to_numeric(d["homeScore"], errors="coerce")
-    d["awayScore"] = pd.to_numeric(d["awayScore"], errors="coerce")
-    if ELOH: d["eloH"] = pd.to_numeric(d[ELOH], errors="coerce")
-    if ELOA: d["eloA"] = pd.to_numeric(d[ELOA], errors="coerce")
+    tm = load_team_matches()
 
     # Fallback tegenstander-ELO uit 'Team Stats'
     ts = _read_csv(GID_TEAM_STATS)
@@ -1274,67 +1346,46 @@ def export_elo_series(xfile: str, out_file: Path):
 
     ts_map = dict(zip(ts["Team"], pd.to_numeric(ts[elo_col], errors="coerce")))
 
+    def floats_or_none(s: pd.Series) -> list:
+        return s.astype(object).where(s.notna(), None).tolist()
 
-    out = {t: {"rounds": [], "elo": [], "opp": [], "oppName": [], "res": [], "gd": []} for t in ALLOWED}
-
-    for _, r in d.iterrows():
-        h, a = r["homeTeam"], r["awayTeam"]
-        hs, as_ = int(r["homeScore"]), int(r["awayScore"])
-        resH = "W" if hs > as_ else ("G" if hs == as_ else "V")
-        resA = "W" if as_ > hs else ("G" if as_ == hs else "V")
-        gdH = hs - as_
-        gdA = as_ - hs
-
-        # HOME perspectief
-        if h in out:
-            out[h]["rounds"].append(len(out[h]["rounds"]) + 1)
-            own_elo = float(r["eloH"]) if ("eloH" in r and pd.notna(r["eloH"])) else None
-            out[h]["elo"].append(own_elo)
-            opp_elo = float(r["eloA"]) if ("eloA" in r and pd.notna(r["eloA"])) else (float(ts_map.get(a)) if pd.notna(ts_map.get(a)) else None)
-            out[h]["opp"].append(opp_elo)
-            out[h]["res"].append(resH)
-            out[h]["gd"].append(int(gdH))
-            out[h]["oppName"].append(a)
-
-        # AWAY perspectief
-        if a in out:
-            out[a]["rounds"].append(len(out[a]["rounds"]) + 1)
-            own_elo = float(r["eloA"]) if ("eloA" in r and pd.notna(r["eloA"])) else None
-            out[a]["elo"].append(own_elo)
-            opp_elo = float(r["eloH"]) if ("eloH" in r and pd.notna(r["eloH"])) else (float(ts_map.get(h)) if pd.notna(ts_map.get(h)) else None)
-            out[a]["opp"].append(opp_elo)
-            out[a]["res"].append(resA)
-            out[a]["gd"].append(int(gdA))
-            out[a]["oppName"].append(h)
-
-    out_file.write_text(json.dumps(out, ensure_ascii=False, indent=2))
-
-
-def export_supersubs_top10(xfile: str, dst: Path):
-    pm = _read_csv(
-        GID_PLAYER_MATCHDATA,
-        usecols=["Player Name", "Team", "Substituted In", "Goals Scored", "Penalties Scored"],
+    tm = tm[tm["team"].isin(ALLOWED)]
+    tm = tm.assign(
+        opp_elo=tm["opp_elo_before"].fillna(tm["opponent"].map(ts_map)),
+        res=np.select([tm["result"] == 1.0, tm["result"] == 0.5], ["W", "G"], default="V"),
     )
+    groups = dict(tuple(tm.groupby("team", sort=False)))
 
-    pm = pm[pm["Team"].isin(ALLOWED)].copy()
-    pm["sub_flag"] = pm["Substituted In"].astype(str).str.lower().isin(["1", "true", "yes"])
-    pm["Goals Scored"] = pd.to_numeric(pm["Goals Scored"], errors="coerce").fillna(0)
-    pm["Penalties Scored"] = pd.to_numeric(pm["Penalties Scored"], errors="coerce").fillna(0)
+    out = {}
+    for t in ALLOWED:
+        g = groups.get(t)
+        if g is None:
+            out[t] = {"rounds": [], "elo": [], "opp": [], "oppName": [], "res": [], "gd": []}
+            continue
+        out[t] = {
+            "rounds": g["round"].tolist(),
+            "elo": floats_or_none(g["elo_before"]),
+            "opp": floats_or_none(g["opp_elo"]),
+            "oppName": g["opponent"].tolist(),
+            "res": g["res"].tolist(),
+            "gd": g["goal_diff"].astype(int).tolist(),
+        }
 
-    as_sub = pm[pm["sub_flag"]].copy()
-    if as_sub.empty:
-        _minidump([], dst)
-        return
+    out_file.write_text(json.dumps(out, ensure_ascii=False, indent=2))
 
-    as_sub["supersub_goals"] = (as_sub["Goals Scored"] - as_sub["Penalties Scored"]).clip(lower=0)
 
-    agg = (
-        as_sub.groupby(["Player Name", "Team"], as_index=False)
-        .agg(
-            goals=("supersub_goals", "sum"),
-            subApps=("sub_flag", "sum"),
-        )
-    )
+def export_supersubs_top10(xfile: str, dst: Path):
+    # invalbeurten en goals (zonder penalty's) als invaller: rij-sommen van de gedeelde matrices
+    pmx = load_player_matrix(PLAYER_INPUT)
+    tot = player_totals(pmx)
+
+    agg = pd.DataFrame({
+        "Player Name": pmx["players"]["Player Name"],
+        "Team": pmx["players"]["Team"],
+        "goals": tot["sub_goals"],
+        "subApps": tot["sub_in"].astype(int),
+    })
+    agg = agg[agg["Team"].isin(ALLOWED)].sort_values(["Player Name", "Team"], kind="stable")
 
     agg = agg[(agg["goals"] > 0) & (agg["subApps"] > 0)].copy()
     agg = agg.sort_values(["goals", "subApps", "Player Name"], ascending=[False, False, True]).head(10)
@@ -1358,22 +1409,28 @@ def main():
     x = sys.argv[1] if len(sys.argv) > 1 else ""
     od = outdir()
     export_team_stats(x, od / "team_stats.json")
+    export_fixture_probs(x, od / "fixture_probs.json")
     export_h2h_all(x, od / "h2h.json")
     export_homeaway_all(x, od / "team_homeaway.json")
     export_event_bins_all(x, od / "team_event_bins.json")
     export_first_scorer_all(x, od / "team_first_scorer.json")
     export_halftime_fulltime_all(x, od / "team_halftime_fulltime.json")
     export_player_stats_all(x, od / "player_stats.json")
+    export_player_timeline(x, od / "player_timeline.json")
     export_points_series(x, od / "team_points.json")
+    export_standings_history(x, od / "standings_history.json")
+    export_schedule_difficulty(x, od / "schedule_difficulty.json")
+    export_asof_index(x, od / "asof_index.json")
     export_elo_series(x, od / "team_elo.json")
     export_rapm_segments_all(x, od / "team_rapm_segments.json")
     export_substitution_stats_all(x, od / "team_substitutions.json")
     export_supersubs_top10(x, od / "supersubs_top10.json")
     export_data_team_csv(od / "data_team.csv")
     print(
-        "OK → team_stats, h2h, homeaway, event_bins, first_scorer, "
-        "halftime_fulltime, player_stats, team_points, team_elo, "
-        "team_rapm_segments, team_substitutions, supersubs_top10, data_team.csv"
+        "OK → team_stats, fixture_probs, h2h, homeaway, event_bins, first_scorer, "
+        "halftime_fulltime, player_stats, player_timeline, team_points, standings_history, "
+        "schedule_difficulty, asof_index, team_elo, team_rapm_segments, team_substitutions, "
+        "supersubs_top10, data_team.csv"
     )
 
 
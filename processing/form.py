@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# ---- CONFIG ----
+FORM_WINDOWS = (3, 5, 10)   # laatste N matchen
+FORM_EWM_SPANS = (5,)       # exponentieel gewogen (span zoals pandas .ewm)
+
+# sleutel in de export -> kolom in team_matches
+FORM_METRICS = {
+    "points": "points",
+    "gd": "goal_diff",
+    "elo": "elo_delta",
+    "gf": "goals_for",
+    "ga": "goals_against",
+}
+
+
+# -------------------------------------------------
+# Vorm per ploeg over willekeurige vensters
+# -------------------------------------------------
+def compute_form(tm: pd.DataFrame, windows=FORM_WINDOWS, spans=FORM_EWM_SPANS) -> dict:
+    """
+    Vorm voor alle ploegen en alle vensters in één pass over team_matches
+    (zie team_matches.build_team_matches: gesorteerd per ploeg en datum).
+
+    - L<w>:     som over de laatste w matchen (of alle matchen als er minder zijn)
+    - EWM<s>:   exponentieel gewogen gemiddelde (adjust=True), recentste match weegt zwaarst
+
+    Returnt {team: {"L3": {...}, "L5": {...}, "EWM5": {...}}}, met per venster
+    dezelfde sleutels (matches + FORM_METRICS) zodat het schema stabiel blijft.
+    """
+    if tm is None or tm.empty:
+        return {}
+
+    tm = tm.sort_values(["team", "date", "match_idx"], kind="stable")
+    elo_delta = (tm["elo_after"] - tm["elo_before"]).fillna(0.0)
+    vals = np.column_stack([
+        elo_delta.to_numpy(dtype=float) if col == "elo_delta" else tm[col].to_numpy(dtype=float)
+        for col in FORM_METRICS.values()
+    ])
+
+    codes, teams = pd.factorize(tm["team"])
+    n_teams = len(teams)
+    counts = np.bincount(codes, minlength=n_teams)
+    ends = np.cumsum(counts)
+    begins = ends - counts
+
+    # prefix-sommen met een nulrij vooraan: som(i..j) = C[j] - C[i]
+    C = np.vstack([np.zeros((1, vals.shape[1])), np.cumsum(vals, axis=0)])
+
+    W = np.asarray(windows, dtype=int)
+    starts = np.maximum(ends[:, None] - W[None, :], begins[:, None])       # (teams, windows)
+    win_sums = C[ends][:, None, :] - C[starts]                             # (teams, windows, metrics)
+    win_n = ends[:, None] - starts
+
+    # EWM: gewicht (1 - alpha)^k met k = aantal matchen sinds de laatste
+    from_end = (ends[codes] - 1) - np.arange(len(codes))
+    ewm = []
+    for span in spans:
+        w = (1 - 2.0 / (span + 1)) ** from_end
+        num = np.stack([np.bincount(codes, weights=w * vals[:, j], minlength=n_teams)
+                        for j in range(vals.shape[1])], axis=1)
+        den = np.bincount(codes, weights=w, minlength=n_teams)
+        ewm.append(num / den[:, None])
+
+    keys = list(FORM_METRICS)
+    out = {}
+    for t, team in enumerate(teams):
+        rec = {}
+        for i, w in enumerate(W):
+            rec[f"L{w}"] = {"matches": int(win_n[t, i])}
+            for j, key in enumerate(keys):
+                v = win_sums[t, i, j]
+                rec[f"L{w}"][key] = round(float(v), 2) if key == "elo" else int(round(v))
+        for i, span in enumerate(spans):
+            rec[f"EWM{span}"] = {"matches": int(counts[t])}
+            for j, key in enumerate(keys):
+                rec[f"EWM{span}"][key] = round(float(ewm[i][t, j]), 3)
+        out[team] = rec
+    return out
+
+
+def empty_form(windows=FORM_WINDOWS, spans=FORM_EWM_SPANS) -> dict:
+    """Zelfde schema als compute_form, met nullen (ploeg zonder gespeelde matchen)."""
+    zero = {"matches": 0, **{k: 0 for k in FORM_METRICS}}
+    return {
+        **{f"L{w}": dict(zero) for w in windows},
+        **{f"EWM{s}": dict(zero) for s in spans},
+    }
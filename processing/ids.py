@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_PATH = "data_raw/id_registry.json"
+
+
+# -------------------------------------------------
+# Stabiele integer-ID's voor (ploeg, speler)
+# -------------------------------------------------
+# Registry-bestand:
+#   {"players": {"<ploeg>": {"<speler>": id, ...}, ...}}
+# ID's worden nooit hergebruikt of hernummerd; nieuwe namen krijgen het
+# volgende vrije nummer (in gesorteerde volgorde, dus deterministisch).
+# Twee spelers met dezelfde naam bij verschillende ploegen krijgen elk een eigen ID.
+#
+# Ploegen krijgen bewust geen registry-ID: ploegnamen zijn de join-sleutel met
+# elke bron (kalender, data_team, events, player_matchdata) en zijn uniek binnen
+# een competitie (reserveploegen dragen een eigen suffix zoals " A"), dus het
+# naamconflict dat speler-ID's oplossen bestaat voor ploegen niet. Binnen een
+# berekening werken team_matches, form, schedule, asof en player_matrix al op
+# dichte lokale codes (factorize / np.unique, één string-hash per tabel);
+# globale, niet-aaneensluitende registry-ID's zouden daar enkel een extra
+# hernummering toevoegen.
+
+
+def load_registry(path: str = REGISTRY_PATH) -> dict:
+    reg = {"players": {}, "changed": False}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf8") as f:
+            data = json.load(f)
+        reg["players"] = {
+            str(t): {str(p): int(i) for p, i in ps.items()}
+            for t, ps in data.get("players", {}).items()
+        }
+    return reg
+
+
+def save_registry(reg: dict, path: str = REGISTRY_PATH):
+    """Schrijf enkel als er nieuwe ID's bijkwamen (atomair via tmp-bestand)."""
+    if not reg.get("changed"):
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump({"players": reg["players"]},
+                  f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    reg["changed"] = False
+
+
+def _next_id(ids) -> int:
+    return max(ids, default=-1) + 1
+
+
+def intern_players(reg: dict, teams, players) -> np.ndarray:
+    """(ploeg, speler) → speler-ID's (nieuwe paren worden toegevoegd); NaN → -1."""
+    t = pd.Series(teams, dtype=object).reset_index(drop=True)
+    p = pd.Series(players, dtype=object).reset_index(drop=True)
+    valid = (t.notna() & p.notna()).to_numpy()
+
+    pairs = pd.MultiIndex.from_arrays([t[valid].astype(str), p[valid].astype(str)])
+    codes, uniq = pairs.factorize()
+
+    known = reg["players"]
+    new = sorted((tn, pn) for tn, pn in uniq if pn not in known.get(tn, {}))
+    if new:
+        start = _next_id(i for ps in known.values() for i in ps.values())
+        for i, (tn, pn) in enumerate(new):
+            known.setdefault(tn, {})[pn] = start + i
+        reg["changed"] = True
+
+    out = np.full(len(t), -1, dtype=np.int64)
+    out[valid] = np.array([known[tn][pn] for tn, pn in uniq], dtype=np.int64)[codes]
+    return out
+
+
+def player_labels(reg: dict) -> dict:
+    """speler-ID → (ploeg, spelersnaam)."""
+    return {i: (tn, pn) for tn, ps in reg["players"].items() for pn, i in ps.items()}
+
+
+def player_names(reg: dict) -> dict:
+    """speler-ID → spelersnaam."""
+    return {i: pn for i, (_, pn) in player_labels(reg).items()}
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+# -------------------------------------------------
+# Gedeelde cache voor tussenresultaten van de pipeline
+# -------------------------------------------------
+# Sleutel = inhoud-hash van de bronbestanden + naam van de stap + hash van de
+# broncode die het resultaat bepaalt (`code`), zodat elke stap (ook in een
+# apart proces) hetzelfde resultaat hergebruikt zolang data én code niet
+# wijzigen. Verouderde entries worden nooit meer geraakt en verdwijnen via de
+# LRU-opruiming zodra de cache te groot wordt.
+
+CACHE_DIR = "data_raw/.cache"
+# bovengrens voor de schijfcache; oudste (minst recent gebruikte) entries gaan eerst weg
+CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+_HASHES: dict[tuple, str] = {}   # (pad, mtime, size) -> sha1
+_MEMO: dict[str, object] = {}    # cache-key -> object (binnen één proces)
+
+
+def file_fingerprint(path) -> str:
+    """sha1 van de bestandsinhoud (per proces onthouden zolang mtime/size gelijk blijven)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    h = _HASHES.get(key)
+    if h is None:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        h = sha.hexdigest()
+        _HASHES[key] = h
+    return h
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """sha1 van kolomnamen + inhoud van een DataFrame (voor invoer die niet uit een bestand komt)."""
+    sha = hashlib.sha1(repr(list(df.columns)).encode("utf8"))
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def cache_key(name: str, paths, extra=None, code=()) -> str:
+    """
+    Sleutel voor een stap: naam + hash van alle bronbestanden + hash van de
+    modules in `code` (hun .py-bestand) + extra parameters.
+    """
+    sha = hashlib.sha1(name.encode("utf8"))
+    for p in paths:
+        sha.update(file_fingerprint(p).encode("ascii"))
+    for m in code:
+        sha.update(file_fingerprint(m.__file__).encode("ascii"))
+    if extra is not None:
+        sha.update(repr(extra).encode("utf8"))
+    return f"{name}-{sha.hexdigest()[:20]}"
+
+
+def evict(max_bytes: int = CACHE_MAX_BYTES, keep=()):
+    """
+    LRU-opruiming: verwijder de minst recent gebruikte pickles (mtime wordt bij
+    elke hit ververst) tot de cache onder max_bytes zit. Paden in `keep` blijven staan.
+    """
+    entries = []
+    for fp in Path(CACHE_DIR).glob("*.pkl"):
+        try:
+            st = fp.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, fp))
+    total = sum(size for _, size, _ in entries)
+    keep = {Path(k) for k in keep}
+    for _, size, fp in sorted(entries):
+        if total <= max_bytes:
+            break
+        if fp in keep:
+            continue
+        try:
+            fp.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+def cached(name: str, paths, builder, extra=None, disk: bool = True, code=()):
+    """
+    Geef builder() terug, gememoiseerd op de inhoud van `paths` en de broncode
+    van de modules in `code` (wijzigt die, dan wordt opnieuw berekend).
+    Eerst in-proces, daarna als pickle in CACHE_DIR (gedeeld tussen stappen).
+    """
+    key = cache_key(name, paths, extra, code)
+    if key in _MEMO:
+        return _MEMO[key]
+
+    fp = Path(CACHE_DIR) / f"{key}.pkl"
+    obj = None
+    if disk and fp.exists():
+        try:
+            with open(fp, "rb") as f:
+                obj = pickle.load(f)
+            os.utime(fp)   # recent gebruikt (LRU)
+        except Exception as e:
+            print(f"[WARN] cache {fp} onleesbaar, opnieuw berekenen: {e}")
+            obj = None
+
+    if obj is None:
+        obj = builder()
+        if disk:
+            try:
+                fp.parent.mkdir(parents=True, exist_ok=True)
+                tmp = fp.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, fp)
+                evict(keep=[fp])
+            except OSError as e:
+                print(f"[WARN] kon cache {fp} niet schrijven: {e}")
+
+    _MEMO[key] = obj
+    return obj
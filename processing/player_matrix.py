@@ -0,0 +1,360 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from dutch_dates import CALENDAR_JSON, load_calendar_table
+from ids import intern_players, load_registry, save_registry
+from pipeline_cache import cached
+
+PLAYER_INPUT = "data_raw/player_matchdata.csv"
+
+BOOL_COLS = ["Starting Player", "Substituted In", "Substituted Out",
+             "Is Goalkeeper", "Is Captain", "Clean Sheet"]
+NUM_COLS = ["Minutes Played", "Goals Scored", "Penalties Scored", "Own Goals Scored",
+            "Yellow Cards", "YellowRed Cards", "Red Cards", "Result P"]
+
+
+# -------------------------------------------------
+# player_matchdata.csv inladen + normaliseren
+# -------------------------------------------------
+def normalize_player_matchdata(df: pd.DataFrame) -> pd.DataFrame:
+    """Booleans (true/1/yes) en numerieke kolommen normaliseren; ontbrekende kolommen aanvullen."""
+    df = df.copy()
+    for col in BOOL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.lower().isin(["true", "1", "yes"])
+        else:
+            df[col] = False
+    for c in NUM_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        else:
+            df[c] = np.nan
+    return df
+
+
+def load_player_matchdata(path: str = PLAYER_INPUT) -> pd.DataFrame:
+    """Genormaliseerde player_matchdata, gememoiseerd per inhoud van het bestand."""
+    return cached(
+        "player_matchdata", [path],
+        lambda: normalize_player_matchdata(pd.read_csv(path)),
+        code=[sys.modules[__name__]],
+    ).copy()
+
+
+# -------------------------------------------------
+# Sparse speler × match matrices
+# -------------------------------------------------
+MATRIX_STATS = (
+    "selected", "started", "sub_in", "sub_out", "minutes", "goals", "penalties",
+    "own_goals", "yellow", "yellow_red", "red", "clean_sheet", "captain", "keeper",
+    "mvp_pts", "mvp_min", "sub_goals",
+)
+
+
+def _stat_values(rows: pd.DataFrame) -> dict:
+    """Per speler-matchrij de additieve waarden die in de matrices terechtkomen."""
+    minutes = rows["Minutes Played"].fillna(0)
+    over20 = rows["Minutes Played"] > 20
+    goals = rows["Goals Scored"].fillna(0)
+    pens = rows["Penalties Scored"].fillna(0)
+    sub_in = rows["Substituted In"]
+    return {
+        "selected": np.ones(len(rows)),
+        "started": rows["Starting Player"],
+        "sub_in": sub_in,
+        "sub_out": rows["Substituted Out"],
+        "minutes": minutes,
+        "goals": goals,
+        "penalties": pens,
+        "own_goals": rows["Own Goals Scored"].fillna(0),
+        "yellow": rows["Yellow Cards"].fillna(0),
+        "yellow_red": rows["YellowRed Cards"].fillna(0),
+        "red": rows["Red Cards"].fillna(0),
+        "clean_sheet": rows["Clean Sheet"],
+        "captain": rows["Is Captain"],
+        "keeper": rows["Is Goalkeeper"],
+        # MVP p>20/90min: teller/noemer van de minuten-gewogen Result P (>20 min)
+        "mvp_pts": (rows["Result P"].fillna(0) * minutes).where(over20, 0.0),
+        "mvp_min": minutes.where(over20, 0.0),
+        # supersubs: goals zonder penalty's als invaller
+        "sub_goals": (goals - pens).clip(lower=0).where(sub_in, 0.0),
+    }
+
+
+def build_player_matrix(pm: pd.DataFrame, cal: pd.DataFrame) -> dict:
+    """
+    Eén rij per (ploeg, speler), één kolom per match (chronologisch, matchen
+    zonder datum achteraan). Returnt:
+
+    - players: DataFrame (Team, Player Name), gesorteerd zoals groupby(["Team", "Player Name"])
+    - matches: DataFrame (url, date) in kolomvolgorde
+    - teams / player_team: ploegnamen en ploegindex per rij
+    - M: {stat: csr_matrix (players × matches)}, dubbele rijen opgeteld;
+      alle matrices delen hetzelfde sparsity-patroon
+    """
+    keep = pm["Team"].fillna("").astype(bool) & pm["Player Name"].fillna("").astype(bool)
+    rows = pm[keep]
+
+    # rijen: (ploeg, speler) gesorteerd
+    pairs = pd.MultiIndex.from_arrays([rows["Team"], rows["Player Name"]])
+    row_codes, players = pairs.factorize(sort=True)
+
+    # kolommen: matchen op datum (stabiel, volgorde van eerste voorkomen bij gelijke datum)
+    url_codes, urls = pd.factorize(rows["Match URL"])
+    dates = pd.Series(urls).map(cal.drop_duplicates("url").set_index("url")["date"])
+    dates = pd.to_datetime(dates)
+    missing = dates.isna().to_numpy()
+    stamp = dates.fillna(pd.Timestamp(0)).to_numpy().astype("int64")
+    order = np.lexsort((np.arange(len(urls)), stamp, missing))
+    col_of = np.empty(len(urls), dtype=np.int64)
+    col_of[order] = np.arange(len(urls))
+    col_codes = col_of[url_codes]
+
+    teams, player_team = np.unique(players.get_level_values(0), return_inverse=True)
+
+    shape = (len(players), len(urls))
+    M = {
+        name: sp.csr_matrix(
+            (np.asarray(vals, dtype=float), (row_codes, col_codes)), shape=shape
+        )
+        for name, vals in _stat_values(rows).items()
+    }
+
+    return {
+        "players": players.to_frame(index=False, name=["Team", "Player Name"]),
+        "matches": pd.DataFrame({"url": urls[order], "date": dates.to_numpy()[order]}),
+        "teams": list(teams),
+        "player_team": player_team,
+        "M": M,
+    }
+
+
+def load_player_matrix(path: str = PLAYER_INPUT, calendar: str = CALENDAR_JSON) -> dict:
+    """
+    Gedeelde speler × match matrices, één keer per run opgebouwd (gememoiseerd
+    op de inhoud van player_matchdata en kalender). Voegt de (ploeg, speler)-ID's
+    uit de registry toe als pmx["players"]["player_id"].
+    """
+    pmx = cached(
+        "player_matrix", [path, calendar],
+        lambda: build_player_matrix(load_player_matchdata(path), load_calendar_table(calendar)),
+        code=[sys.modules[__name__], sys.modules["dutch_dates"]],
+    )
+    pmx = dict(pmx, players=pmx["players"].copy())
+    reg = load_registry()
+    pmx["players"]["player_id"] = intern_players(
+        reg, pmx["players"]["Team"], pmx["players"]["Player Name"]
+    )
+    save_registry(reg)
+    return pmx
+
+
+# -------------------------------------------------
+# Aggregaties = sparse rij-sommen
+# -------------------------------------------------
+def team_match_incidence(pmx: dict) -> sp.csr_matrix:
+    """ploegen × matchen: 1 als de ploeg in die match spelers had."""
+    P = sp.csr_matrix(
+        (np.ones(len(pmx["player_team"])), (pmx["player_team"], np.arange(len(pmx["player_team"])))),
+        shape=(len(pmx["teams"]), len(pmx["player_team"])),
+    )
+    T = (P @ pmx["M"]["selected"]).tocsr()
+    T.data[:] = 1.0
+    T.sort_indices()
+    return T
+
+
+def team_last_n(pmx: dict, n: int = 5) -> sp.csr_matrix:
+    """ploegen × matchen: enkel de laatste n matchen van elke ploeg (kolommen zijn chronologisch)."""
+    T = team_match_incidence(pmx)
+    counts = np.diff(T.indptr)
+    from_end = np.repeat(T.indptr[1:], counts) - 1 - np.arange(T.nnz)
+    T.data = (from_end < n).astype(float)
+    T.eliminate_zeros()
+    return T
+
+
+def player_totals(pmx: dict, team_window: sp.csr_matrix | None = None) -> pd.DataFrame:
+    """
+    Rij-sommen van alle matrices (één kolom per stat, één rij per speler).
+    Met team_window (ploegen × matchen) enkel over de matchen van de eigen ploeg in dat venster.
+    """
+    mask = None
+    if team_window is not None:
+        mask = team_window[pmx["player_team"]]   # spelers × matchen
+    out = {}
+    for name, M in pmx["M"].items():
+        X = M if mask is None else M.multiply(mask)
+        out[name] = np.asarray(X.sum(axis=1)).ravel()
+    return pd.DataFrame(out)
+
+
+# -------------------------------------------------
+# Match-gepartitioneerde index van speler-matchrijen
+# -------------------------------------------------
+def build_match_index(pm: pd.DataFrame) -> dict:
+    """
+    Sorteer player_matchdata één keer per Match URL (stabiel, dus de
+    oorspronkelijke volgorde binnen een match blijft behouden) en onthoud
+    de offsets: de rijen van match i zijn rows[offsets[i]:offsets[i + 1]].
+    """
+    codes, urls = pd.factorize(pm["Match URL"])
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(urls))
+    return {
+        "rows": pm.iloc[order[codes[order] >= 0]].reset_index(drop=True),
+        "urls": urls,
+        "offsets": np.concatenate([[0], np.cumsum(counts)]),
+    }
+
+
+def starting_lineup_rows(idx: dict, key: str = "Player Name") -> pd.DataFrame:
+    """
+    Platte tabel (Match URL, Team, key) met de basisspelers per match en ploeg.
+    Fallback als 'Starting Player' niet ingevuld is voor die ploeg: alle
+    spelers met Minutes Played > 0.
+    """
+    rows = idx["rows"]
+    cols = ["Match URL", "Team", key]
+    starters = rows.loc[rows["Starting Player"], cols]
+    played = rows.loc[rows["Minutes Played"] > 0, cols]
+
+    have = pd.MultiIndex.from_frame(starters[["Match URL", "Team"]])
+    fallback = played[~pd.MultiIndex.from_frame(played[["Match URL", "Team"]]).isin(have)]
+    return pd.concat([starters, fallback])
+
+
+# -------------------------------------------------
+# Streaming: begrensd geheugen over meerdere seizoenen/competities
+# -------------------------------------------------
+LINEUP_COLS = ["Match URL", "Team", "Player Name", "Starting Player", "Minutes Played"]
+
+
+def _push_last_n(buf: dict, url, key, sums: pd.DataFrame, n: int):
+    """
+    Ringbuffer met de n recentste matchen van één ploeg: {url: (key, sums)}.
+    key = (zonder datum, datum, volgnummer) zodat de volgorde gelijk is aan een
+    stabiele sortering op datum (matchen zonder datum achteraan).
+    """
+    if url in buf:
+        k, prev = buf[url]
+        buf[url] = (k, prev.add(sums, fill_value=0))
+        return
+    if len(buf) >= n:
+        oldest = min(buf, key=lambda u: buf[u][0])
+        if key < buf[oldest][0]:
+            return
+        del buf[oldest]
+    buf[url] = (key, sums)
+
+
+def _codes(lookup: dict, values) -> np.ndarray:
+    """Waarden → volgnummer van eerste voorkomen (lookup wordt aangevuld)."""
+    return np.array([lookup.setdefault(v, len(lookup)) for v in values], dtype=np.int32)
+
+
+def _add_lineups(acc: dict, rows: pd.DataFrame, reg: dict):
+    """
+    Basiself (zie starting_lineup_rows) van volledige matchen als compacte
+    arrays: url-code, ploeg-code en speler-ID per basisspeler.
+    """
+    if rows.empty:
+        return
+    lu = starting_lineup_rows(build_match_index(rows))
+    lu = lu[lu["Match URL"].notna() & lu["Team"].notna()]
+    acc["parts"].append((
+        _codes(acc["urls"], lu["Match URL"]),
+        _codes(acc["teams"], lu["Team"]),
+        intern_players(reg, lu["Team"], lu["Player Name"]),
+    ))
+
+
+def _lineup_frame(acc: dict) -> pd.DataFrame:
+    """(Match URL, Team, player_id) zoals compute_rapm_from_logs ze verwacht (categoricals)."""
+    parts = acc["parts"] or [(np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.int64))]
+    url_codes, team_codes, ids = (np.concatenate(a) for a in zip(*parts))
+    return pd.DataFrame({
+        "Match URL": pd.Categorical.from_codes(url_codes, categories=list(acc["urls"])),
+        "Team": pd.Categorical.from_codes(team_codes, categories=list(acc["teams"])),
+        "player_id": ids,
+    })
+
+
+def stream_player_totals(path: str, cal: pd.DataFrame, chunksize: int, last_n: int = 5) -> dict:
+    """
+    Zelfde totalen als player_totals(load_player_matrix()) en
+    player_totals(pmx, team_last_n(pmx, last_n)), maar player_matchdata wordt
+    in blokken gelezen. Geheugen voor de totalen = lopende som per (ploeg,
+    speler) + per ploeg de laatste `last_n` matchen, onafhankelijk van het
+    aantal speler-matchrijen.
+
+    Verwacht dat de rijen van één match aaneensluitend in het bestand staan
+    (zoals de scraper ze wegschrijft). Returnt ook `lineups`: de basiself per
+    (match, ploeg) als (Match URL, Team, player_id), per afgewerkte match
+    opgebouwd. Die groeit wel met het aantal matchen (±22 integers per match);
+    RAPM zelf streamt niet (zie build_player_stats.load_rapm_segments).
+    """
+    date_of = cal.drop_duplicates("url").set_index("url")["date"]
+    first_seen: dict = {}                 # url -> volgnummer (eerste voorkomen)
+    buffers: dict = {}                    # ploeg -> ringbuffer
+    tot = None
+    reg = load_registry()
+    lineups = {"urls": {}, "teams": {}, "parts": []}
+    carry = None                          # rijen van de laatste, mogelijk onvolledige match
+
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk = normalize_player_matchdata(chunk)
+            keep = chunk["Team"].fillna("").astype(bool) & chunk["Player Name"].fillna("").astype(bool)
+            rows = chunk[keep]
+
+            # basiself enkel voor afgewerkte matchen: de laatste match van het
+            # blok kan in het volgende blok doorlopen
+            lu = chunk[LINEUP_COLS]
+            if carry is not None:
+                lu = pd.concat([carry, lu], ignore_index=True)
+            is_open = (lu["Match URL"] == lu["Match URL"].iloc[-1]).to_numpy()
+            _add_lineups(lineups, lu[~is_open], reg)
+            carry = lu[is_open]
+
+            vals = pd.DataFrame(_stat_values(rows), index=rows.index)
+            vals[["Team", "Player Name", "Match URL"]] = rows[["Team", "Player Name", "Match URL"]]
+            per_match = vals.groupby(["Team", "Match URL", "Player Name"], sort=False).sum()
+
+            part = per_match.groupby(level=["Team", "Player Name"]).sum()
+            tot = part if tot is None else tot.add(part, fill_value=0)
+
+            for url in rows["Match URL"].drop_duplicates():
+                first_seen.setdefault(url, len(first_seen))
+            for (team, url), sums in per_match.groupby(level=["Team", "Match URL"], sort=False):
+                d = pd.to_datetime(date_of.get(url))
+                key = (pd.isna(d), pd.Timestamp(0) if pd.isna(d) else d, first_seen[url])
+                _push_last_n(buffers.setdefault(team, {}), url, key,
+                             sums.droplevel(["Team", "Match URL"]), last_n)
+
+    if carry is not None:
+        _add_lineups(lineups, carry, reg)
+    save_registry(reg)
+
+    if tot is None:
+        empty = pd.DataFrame(columns=list(MATRIX_STATS), dtype=float)
+        return {"players": pd.DataFrame(columns=["Team", "Player Name"]), "tot": empty,
+                "l5": empty, "lineups": _lineup_frame(lineups)}
+
+    tot = tot.sort_index()
+    l5_parts = [
+        sums.assign(Team=team).set_index("Team", append=True).reorder_levels(["Team", "Player Name"])
+        for team, buf in buffers.items() for _, sums in buf.values()
+    ]
+    l5 = pd.concat(l5_parts).groupby(level=["Team", "Player Name"]).sum()
+    l5 = l5.reindex(tot.index, fill_value=0)
+
+    return {
+        "players": tot.index.to_frame(index=False),
+        "tot": tot.reset_index(drop=True),
+        "l5": l5.reset_index(drop=True),
+        "lineups": _lineup_frame(lineups),
+    }
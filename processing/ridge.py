@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+# -------------------------------------------------
+# Gewogen ridge-regressie via één eigendecompositie
+# -------------------------------------------------
+# min_b  sum_i w_i (y_i - x_i b)^2 + alpha * |b|^2   (alle coëfficiënten
+# bestraft, ook het intercept; zoals Ridge(fit_intercept=False)).
+#
+# Met G = X'WX = V diag(lam) V' geldt voor elke alpha:
+#   b           = V diag(1 / (lam + alpha)) V' X'Wy
+#   diag(inv)   = sum_j V_ij^2 / (lam_j + alpha)
+#   df_eff      = trace(G (G + alpha I)^-1) = sum_j lam_j / (lam_j + alpha)
+# Eén factor per design (X, w) volstaat dus voor meerdere targets en alpha's.
+
+
+def ridge_factor(X, w) -> dict:
+    """
+    Normaalvergelijkingen X'WX één keer opbouwen (sparse product, p × p dense)
+    en eigendecomponeren. X: (n × p) dense of scipy.sparse, w: gewichten (n,).
+    """
+    w = np.asarray(w, dtype=float)
+    X = sp.csr_matrix(X)
+    G = (X.T @ sp.diags(w) @ X).toarray()
+    lam, V = np.linalg.eigh(G)
+    return {
+        "X": X,
+        "w": w,
+        "lam": np.clip(lam, 0.0, None),   # G is PSD; afrondingsruis onder 0 wegknippen
+        "V": V,
+    }
+
+
+def ridge_solve(fac: dict, Y, alpha: float) -> np.ndarray:
+    """
+    Coëfficiënten voor één of meerdere targets tegen dezelfde factor.
+    Y: (n,) → (p,), of (n × k) → (p × k).
+    """
+    Y = np.asarray(Y, dtype=float)
+    XtWY = fac["X"].T @ (fac["w"][:, None] * Y.reshape(len(fac["w"]), -1))
+    B = fac["V"] @ ((fac["V"].T @ XtWY) / (fac["lam"] + alpha)[:, None])
+    return B.ravel() if Y.ndim == 1 else B
+
+
+def ridge_inverse_diag(fac: dict, alpha: float) -> np.ndarray:
+    """diag((X'WX + alpha I)^-1) zonder de inverse te vormen."""
+    return (fac["V"] ** 2) @ (1.0 / (fac["lam"] + alpha))
+
+
+def ridge_df(fac: dict, alpha: float) -> float:
+    """Effectieve vrijheidsgraden: trace van de hat-matrix."""
+    return float(np.sum(fac["lam"] / (fac["lam"] + alpha)))
+
+
+def ridge_fit(fac: dict, y, alpha: float, se: bool = False) -> dict:
+    """
+    Fit één target. Met se=True ook de standaardfouten van de coëfficiënten:
+      sigma2 = RSS_w / max(n - df_eff, 1),  var(b) = diag(inv) * sigma2
+    """
+    y = np.asarray(y, dtype=float)
+    coef = ridge_solve(fac, y, alpha)
+    out = {"coef": coef}
+    if se:
+        resid = y - fac["X"] @ coef
+        rss = float(np.sum(fac["w"] * resid ** 2))
+        df_eff = ridge_df(fac, alpha)
+        sigma2 = rss / max(len(y) - df_eff, 1.0)
+        out.update({
+            "rss": rss,
+            "df_eff": df_eff,
+            "sigma2": sigma2,
+            "se": np.sqrt(ridge_inverse_diag(fac, alpha) * sigma2),
+        })
+    return out
+
+
+# -------------------------------------------------
+# Alpha-selectie: GCV en leave-one-match-out over een grid, één factor
+# -------------------------------------------------
+def ridge_path(fac: dict, Y, alphas, groups=None) -> dict:
+    """
+    Foutcurves over een grid van alpha's zonder opnieuw te factoriseren.
+    Y: (n,) of (n × k) targets die de factor delen; groups: groep per rij
+    (bv. match) voor leave-one-group-out.
+
+    Met z = V'X'Wy en d = 1 / (lam + alpha) kost elke alpha O(p) voor:
+      RSS_w = y'Wy - 2 sum d z^2 + sum lam d^2 z^2
+      GCV   = (RSS_w / sum w) / (1 - df_eff / n)^2
+    Leave-one-group-out gebruikt de exacte blokformule voor ridge:
+      e_(-g) = (I - H_gg)^-1 e_g,  H_gg = U_g diag(d) U_g' W_g,  U_g = X_g V
+    (blokken van één match, voor alle alpha's en targets tegelijk).
+    Foutmaat = gewogen gemiddelde kwadratische fout (sum w e^2 / sum w).
+
+    Returnt {"alphas", "df" (A,), "gcv" (A × k), "lomo" (A × k) of None}.
+    """
+    Y = np.asarray(Y, dtype=float)
+    Y2 = Y.reshape(len(fac["w"]), -1)
+    w, lam, V, X = fac["w"], fac["lam"], fac["V"], fac["X"]
+    alphas = np.asarray(alphas, dtype=float)
+    n, w_sum = len(w), float(w.sum())
+
+    Z = V.T @ (X.T @ (w[:, None] * Y2))              # p × k
+    D = 1.0 / (lam[None, :] + alphas[:, None])       # A × p
+    Z2 = Z ** 2
+    yWy = (w[:, None] * Y2 ** 2).sum(axis=0)
+    rss = np.clip(yWy[None, :] - 2.0 * D @ Z2 + (D ** 2 * lam) @ Z2, 0.0, None)
+    df = (lam * D).sum(axis=1)
+    gcv = (rss / w_sum) / np.maximum(1.0 - df / n, 1e-12)[:, None] ** 2
+
+    lomo = None
+    if groups is not None:
+        codes = pd.factorize(np.asarray(groups))[0]
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1], True])
+        err = np.zeros((len(alphas), Y2.shape[1]))
+        B = D[:, :, None] * Z[None, :, :]            # coëfficiënten in eigenbasis: A × p × k
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            rows = order[lo:hi]
+            Ug = np.asarray(X[rows] @ V)             # n_g × p
+            Wg = w[rows]
+            H = np.matmul(Ug[None, :, :] * D[:, None, :], Ug.T) * Wg[None, None, :]   # A × n_g × n_g
+            E = Y2[rows][None, :, :] - np.matmul(Ug[None, :, :], B)                   # A × n_g × k
+            E_loo = np.linalg.solve(np.eye(len(rows))[None, :, :] - H, E)
+            err += np.einsum("agk,g->ak", E_loo ** 2, Wg)
+        lomo = err / w_sum
+
+    return {"alphas": alphas, "df": df, "gcv": gcv, "lomo": lomo}
+
+
+def best_alpha(path: dict, criterion: str = "lomo") -> np.ndarray:
+    """Index van de beste alpha per target (valt terug op GCV zonder groepen)."""
+    curve = path[criterion] if path.get(criterion) is not None else path["gcv"]
+    return np.argmin(curve, axis=0)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from elo_engine import fixture_probabilities
+from team_matches import stack_sides
+
+
+# -------------------------------------------------
+# Moeilijkheid resterend programma, "as of" elke speeldag
+# -------------------------------------------------
+def schedule_difficulty(df: pd.DataFrame, teams=None) -> dict:
+    """
+    Voor elke speeldag N (0 = voor de eerste match, N = na speeldag N uit de
+    kalender, zie team_matches.fixture_matchdays) en elke ploeg:
+
+    - rating:     ELO van de ploeg na haar laatste match t.e.m. speeldag N
+    - opp_h/opp_a/opp_total: gemiddelde huidige ELO van de resterende tegenstanders
+    - remaining:  aantal resterende matchen
+    - xpts:       verwachte punten uit de resterende matchen (3·p_win + p_draw)
+    - pct:        percentiel (0–100) van opp_total binnen de competitie; 100 = zwaarste programma
+    - league_avg: gemiddelde rating per speeldag
+
+    Alles als (n_rounds + 1) × n_teams matrices, berekend in één gevectoriseerde
+    pass over alle (speeldag, fixture)-combinaties. `df` is data_team.csv
+    (gespeelde én toekomstige matchen).
+    """
+    sides = stack_sides(df)
+    if teams is None:
+        teams = sorted(set(sides["team"]))
+    team_index = pd.Index(teams)
+    sides = sides[sides["team"].isin(teams) & sides["opponent"].isin(teams)]
+    sides = sides.sort_values(["team", "date", "match_idx"], kind="stable").reset_index(drop=True)
+
+    n_teams = len(teams)
+    t_idx = team_index.get_indexer(sides["team"])
+    o_idx = team_index.get_indexer(sides["opponent"])
+    is_home = sides["is_home"].to_numpy() == 1
+    played = sides["played"].to_numpy()
+
+    # speeldag van elke gespeelde fixture (0 voor niet-gespeelde)
+    played_md = np.where(played, sides["matchday"].to_numpy(), 0)
+    n_rounds = int(played_md.max()) if len(played_md) else 0
+
+    # ratings[N, team]: startrating op rij 0, daarna elo_after van de laatste
+    # match van de ploeg op speeldag N (inhaalmatchen vallen samen), forward-fill
+    ratings = np.full((n_rounds + 1, n_teams), np.nan)
+    start = sides.groupby("team")["elo_before"].first()
+    ratings[0, team_index.get_indexer(start.index)] = start.to_numpy(dtype=float)
+    last = pd.DataFrame({"md": played_md, "t": t_idx})[played_md > 0].drop_duplicates(keep="last")
+    ratings[last["md"], last["t"]] = sides["elo_after"].to_numpy(dtype=float)[last.index]
+    ratings = pd.DataFrame(ratings).ffill().to_numpy()
+
+    # remaining[N, f]: fixture f is nog niet gespeeld na speeldag N
+    N = np.arange(n_rounds + 1)[:, None]
+    remaining = (~played)[None, :] | (played_md[None, :] > N)
+
+    own = ratings[:, t_idx]
+    opp = ratings[:, o_idx]
+
+    # kansen vanuit het perspectief van de ploeg (thuis of uit)
+    elo_home = np.where(is_home[None, :], own, opp)
+    elo_away = np.where(is_home[None, :], opp, own)
+    p_home, p_draw, p_away = fixture_probabilities(elo_home, elo_away)
+    p_win = np.where(is_home[None, :], p_home, p_away)
+    xpts_f = 3 * p_win + p_draw
+
+    onehot = np.zeros((len(t_idx), n_teams))
+    onehot[np.arange(len(t_idx)), t_idx] = 1.0
+
+    def per_team(values, mask):
+        return np.where(mask, np.nan_to_num(values), 0.0) @ onehot
+
+    rem_h = remaining & is_home[None, :]
+    rem_a = remaining & ~is_home[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        opp_h = per_team(opp, rem_h) / per_team(1.0, rem_h)
+        opp_a = per_team(opp, rem_a) / per_team(1.0, rem_a)
+        n_rem = per_team(1.0, remaining)
+        opp_total = per_team(opp, remaining) / n_rem
+
+    xpts = per_team(xpts_f, remaining)
+    pct = pd.DataFrame(opp_total).rank(axis=1, pct=True).to_numpy() * 100.0
+
+    return {
+        "teams": list(teams),
+        "rounds": list(range(n_rounds + 1)),
+        "rating": ratings,
+        "opp_h": opp_h,
+        "opp_a": opp_a,
+        "opp_total": opp_total,
+        "remaining": n_rem.astype(int),
+        "xpts": xpts,
+        "pct": pct,
+        "league_avg": np.nanmean(ratings, axis=1),
+    }
+
+
+def difficulty_as_of(sd: dict, round_no=None) -> pd.DataFrame:
+    """Eén rij per ploeg voor speeldag `round_no` (standaard: de laatste = huidige stand)."""
+    r = sd["rounds"][-1] if round_no is None else int(round_no)
+    return pd.DataFrame({
+        "team": sd["teams"],
+        "rating": sd["rating"][r],
+        "opp_h": sd["opp_h"][r],
+        "opp_a": sd["opp_a"][r],
+        "opp_total": sd["opp_total"][r],
+        "opp_diff_ha": sd["opp_h"][r] - sd["opp_a"][r],
+        "opp_diff_tot": sd["opp_total"][r] - sd["league_avg"][r],
+        "remaining": sd["remaining"][r],
+        "xpts": sd["xpts"][r],
+        "pct": sd["pct"][r],
+    })
@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+
+from events import EventCode, GOAL_CODES, SENDING_OFF_CODES, SUB_CODES
+
+# events die een nieuw RAPM-segment starten (goal, wissel, uitsluiting)
+BOUNDARY_CODES = GOAL_CODES + SUB_CODES + SENDING_OFF_CODES
+
+# één record per segment; ploegen/matchen als index in segs["teams"] / segs["matches"]
+SEGMENT_DTYPE = np.dtype([
+    ("match", np.int32),
+    ("home", np.int32),
+    ("away", np.int32),
+    ("duration", np.float64),
+    ("gd_delta", np.float64),
+    ("gf", np.float64),              # goals thuisploeg in het segment
+    ("ga", np.float64),              # goals uitploeg in het segment
+    ("t_start", np.float64),
+    ("t_end", np.float64),
+    ("gd_start", np.float64),
+    ("gd_end", np.float64),
+    ("man_diff_start", np.float64),
+    ("man_diff_end", np.float64),
+])
+
+
+# -------------------------------------------------
+# Segmenten: gestructureerde array + platte line-upbuffer (CSR)
+# -------------------------------------------------
+# segs = {
+#   "seg":        structured array (SEGMENT_DTYPE), n_seg records
+#   "matches":    Match URL per match-index
+#   "teams":      ploegnaam per team-index
+#   "lineup":     speler-ID's op het veld, achter elkaar
+#   "lineup_ptr": offsets (2 * n_seg + 1): thuisspelers van segment k =
+#                 lineup[ptr[2k]:ptr[2k+1]], uitspelers = lineup[ptr[2k+1]:ptr[2k+2]]
+# }
+
+
+def empty_segments() -> dict:
+    return {
+        "seg": np.zeros(0, dtype=SEGMENT_DTYPE),
+        "matches": np.array([], dtype=object),
+        "teams": np.array([], dtype=object),
+        "lineup": np.zeros(0, dtype=np.int64),
+        "lineup_ptr": np.zeros(1, dtype=np.int64),
+    }
+
+
+def prepare_events(me: pd.DataFrame) -> dict:
+    """
+    Genormaliseerde events (zie events.normalize_events, met player_id) als
+    NumPy-arrays, één keer gesorteerd op (match, minuut, oorspronkelijke volgorde).
+    Events van match i zijn rijen offsets[i]:offsets[i + 1].
+
+    - side:         +1 als 'team' de thuisploeg is, -1 de uitploeg, 0 anders
+    - goal_side:    +1 goal voor thuis, -1 goal voor uit, 0 geen goal
+                    (own goal telt voor de tegenstander, eventueel via team_against)
+    """
+    match_codes, matches = pd.factorize(me["matchurl"], sort=True)
+    minute = me["minute_abs"].fillna(0).astype(int).to_numpy()
+    valid = match_codes >= 0
+    order = np.flatnonzero(valid)[np.lexsort((minute[valid], match_codes[valid]))]
+
+    def text(col):
+        if col not in me.columns:
+            return np.full(len(order), "", dtype=object)
+        return me[col].astype(str).to_numpy(dtype=object)[order]
+
+    m = match_codes[order]
+    code = me["code"].to_numpy()[order]
+    team, home, away = text("team"), text("home_team"), text("away_team")
+    against = text("team_against")
+
+    side = np.where(team == home, 1, np.where(team == away, -1, 0))
+    side_against = np.where(against == home, 1, np.where(against == away, -1, 0))
+
+    goal_side = np.zeros(len(order), dtype=int)
+    scored = np.isin(code, (EventCode.GOAL, EventCode.PENALTY))
+    own = code == EventCode.OWN_GOAL
+    goal_side[scored] = side[scored]
+    goal_side[own] = np.where(side[own] != 0, -side[own], side_against[own])
+
+    offsets = np.searchsorted(m, np.arange(len(matches) + 1))
+    first = offsets[:-1]
+    return {
+        "matches": np.asarray(matches, dtype=object),
+        "offsets": offsets,
+        "home_team": home[first],
+        "away_team": away[first],
+        "match": m,
+        "minute": minute[order],
+        "code": code,
+        "side": side,
+        "goal_side": goal_side,
+        "player_id": me["player_id"].to_numpy(dtype=np.int64)[order],
+    }
+
+
+def build_segments(ev: dict, lineups: pd.DataFrame, key: str = "player_id") -> dict:
+    """
+    Segmenten tussen opeenvolgende "boundary minutes" (minuten met een goal,
+    wissel of uitsluiting), gevectoriseerd over alle matchen:
+
+    - segment j van een match loopt van boundary j-1 (of 0') tot boundary j,
+      duur = max(verschil, 1); de goals van de boundary-minuut tellen in dat segment
+    - spelers op het veld = basiself (lineups: Match URL, Team, key) met de
+      wissels/uitsluitingen van alle eerdere boundary-minuten toegepast
+      (per speler en minuut telt het laatste event)
+    - staartsegment tot max(laatste boundary + 1, 90') zonder goals, enkel als
+      er nog spelers op het veld staan
+    - matchen zonder boundary: één 0–0 segment van 90'
+    - matchen zonder basisspelers voor beide ploegen worden overgeslagen
+    """
+    n_matches = len(ev["matches"])
+    if n_matches == 0:
+        return empty_segments()
+
+    teams, team_codes = np.unique(np.r_[ev["home_team"], ev["away_team"]], return_inverse=True)
+    home_code, away_code = team_codes[:n_matches], team_codes[n_matches:]
+
+    # --- basiself per (match, kant) ---
+    lu_match = pd.Index(ev["matches"]).get_indexer(lineups["Match URL"])
+    lu_team = lineups["Team"].astype(str).to_numpy(dtype=object)
+    ok = lu_match >= 0
+    lu_side = np.zeros(len(lineups), dtype=int)
+    lu_side[ok] = np.where(lu_team[ok] == ev["home_team"][lu_match[ok]], 1,
+                           np.where(lu_team[ok] == ev["away_team"][lu_match[ok]], -1, 0))
+    init = pd.DataFrame({
+        "match": lu_match, "side": lu_side, "player": lineups[key].to_numpy(dtype=np.int64),
+    })[ok & (lu_side != 0)].drop_duplicates()
+    n_init = np.zeros((n_matches, 2), dtype=int)
+    np.add.at(n_init, (init["match"].to_numpy(), (init["side"].to_numpy() < 0).astype(int)), 1)
+    has_lineup = n_init.sum(axis=1) > 0
+
+    # --- boundary minutes (uniek per match) ---
+    is_b = np.isin(ev["code"], BOUNDARY_CODES) & has_lineup[ev["match"]]
+    b_rows = np.flatnonzero(is_b)
+    bm, bmin = ev["match"][b_rows], ev["minute"][b_rows]
+    new_b = np.ones(len(b_rows), dtype=bool)
+    new_b[1:] = (bm[1:] != bm[:-1]) | (bmin[1:] != bmin[:-1])
+    b_of_row = np.cumsum(new_b) - 1                       # boundary-index per boundary-event
+    B_match, B_min = bm[new_b], bmin[new_b]
+    n_b = np.bincount(B_match, minlength=n_matches)
+
+    gs = ev["goal_side"][b_rows]
+    B_gf = np.bincount(b_of_row, weights=(gs > 0), minlength=len(B_match))
+    B_ga = np.bincount(b_of_row, weights=(gs < 0), minlength=len(B_match))
+
+    # --- slots: per match n_b boundary-segmenten + 1 staart (of het enige 0–0 segment) ---
+    n_slots = np.where(has_lineup, n_b + 1, 0)
+    slot_off = np.r_[0, np.cumsum(n_slots)]
+    n_total = int(slot_off[-1])
+    slot_match = np.repeat(np.arange(n_matches), n_slots)
+    slot_j = np.arange(n_total) - slot_off[slot_match]
+    is_tail = slot_j == n_b[slot_match]
+
+    b_first = np.r_[0, np.cumsum(n_b)][slot_match]        # eerste boundary-index van de match
+    b_idx = b_first + slot_j                              # boundary die het segment afsluit
+    prev_min = np.where(slot_j > 0, B_min[np.clip(b_idx - 1, 0, None)] if len(B_min) else 0, 0)
+
+    last_b = np.clip(b_first + n_b[slot_match] - 1, 0, None)
+    tail_end = np.where(n_b[slot_match] > 0, np.maximum((B_min[last_b] if len(B_min) else 0) + 1, 90), 90)
+
+    t_start = prev_min.astype(float)
+    t_end = np.where(is_tail, tail_end, B_min[np.clip(b_idx, 0, max(len(B_min) - 1, 0))] if len(B_min) else 0)
+    t_end = t_end.astype(float)
+    duration = np.where(is_tail, t_end - t_start, np.maximum(t_end - t_start, 1.0))
+
+    gf = np.zeros(n_total)
+    ga = np.zeros(n_total)
+    gf[~is_tail] = B_gf[b_idx[~is_tail]]
+    ga[~is_tail] = B_ga[b_idx[~is_tail]]
+    gd_delta = gf - ga
+    cum = np.cumsum(gd_delta)
+    gd_start = cum - gd_delta - np.repeat(np.r_[0.0, cum][slot_off[:-1]], n_slots)
+    gd_end = gd_start + gd_delta
+
+    # --- line-up toestand per slot ---
+    # wijziging in boundary j geldt vanaf slot j + 1; laatste event per (match, kant, speler, boundary)
+    chg = np.isin(ev["code"][b_rows], (EventCode.SUB_IN, EventCode.SUB_OUT) + SENDING_OFF_CODES)
+    chg &= ev["side"][b_rows] != 0
+    changes = pd.DataFrame({
+        "match": bm[chg],
+        "side": ev["side"][b_rows][chg],
+        "player": ev["player_id"][b_rows][chg],
+        "pos": (b_of_row - np.r_[0, np.cumsum(n_b)][bm])[chg] + 1,
+        "on": ev["code"][b_rows][chg] == EventCode.SUB_IN,
+    }).drop_duplicates(["match", "side", "player", "pos"], keep="last")
+    states = pd.concat(
+        [init.assign(pos=0, on=True), changes], ignore_index=True
+    ).sort_values(["match", "side", "player", "pos"], kind="stable")
+
+    s_match = states["match"].to_numpy()
+    s_side = states["side"].to_numpy()
+    s_player = states["player"].to_numpy()
+    s_pos = states["pos"].to_numpy()
+    same_next = np.r_[
+        (s_match[1:] == s_match[:-1]) & (s_side[1:] == s_side[:-1]) & (s_player[1:] == s_player[:-1]),
+        False,
+    ]
+    s_end = np.where(same_next, np.r_[s_pos[1:], 0], n_slots[s_match])
+    on = states["on"].to_numpy() & (s_end > s_pos)
+    lens = (s_end - s_pos)[on]
+    start_slot = (slot_off[s_match] + s_pos)[on]
+    e_slot = np.repeat(start_slot, lens) + np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+    e_away = np.repeat(s_side[on] < 0, lens)
+    e_player = np.repeat(s_player[on], lens)
+
+    n_on = np.zeros((n_total, 2), dtype=int)
+    np.add.at(n_on, (e_slot, e_away.astype(int)), 1)
+    man_start = (n_on[:, 0] - n_on[:, 1]).astype(float)
+    man_end = np.where(is_tail, man_start, np.r_[man_start[1:], 0.0])
+
+    # staart zonder spelers op het veld valt weg
+    keep = ~is_tail | (n_on.sum(axis=1) > 0)
+    new_idx = np.cumsum(keep) - 1
+
+    seg = np.zeros(int(keep.sum()), dtype=SEGMENT_DTYPE)
+    seg["match"] = slot_match[keep]
+    seg["home"] = home_code[slot_match[keep]]
+    seg["away"] = away_code[slot_match[keep]]
+    for name, vals in (
+        ("duration", duration), ("gd_delta", gd_delta), ("gf", gf), ("ga", ga),
+        ("t_start", t_start), ("t_end", t_end), ("gd_start", gd_start), ("gd_end", gd_end),
+        ("man_diff_start", man_start), ("man_diff_end", man_end),
+    ):
+        seg[name] = vals[keep]
+
+    # --- platte line-upbuffer: per segment eerst thuis, dan uit (spelers oplopend) ---
+    e_keep = keep[e_slot]
+    bucket = 2 * new_idx[e_slot[e_keep]] + e_away[e_keep]
+    order = np.lexsort((e_player[e_keep], bucket))
+    ptr = np.r_[0, np.cumsum(np.bincount(bucket, minlength=2 * len(seg)))]
+
+    return {
+        "seg": seg,
+        "matches": ev["matches"],
+        "teams": np.asarray(teams, dtype=object),
+        "lineup": e_player[e_keep][order],
+        "lineup_ptr": ptr.astype(np.int64),
+    }
+
+
+def segment_lineups(segs: dict, side: str = "home") -> list[np.ndarray]:
+    """Spelers per segment voor één kant (views in de buffer), bv. voor exports."""
+    ptr, lineup = segs["lineup_ptr"], segs["lineup"]
+    k = 0 if side == "home" else 1
+    return [lineup[ptr[2 * i + k]:ptr[2 * i + k + 1]] for i in range(len(segs["seg"]))]
+
+
+def segment_frame(segs: dict) -> pd.DataFrame:
+    """Scalaire segmentkolommen als DataFrame, met Match URL en ploegnamen."""
+    df = pd.DataFrame(segs["seg"])
+    df["match"] = segs["matches"][df["match"].to_numpy()] if len(df) else []
+    df["home"] = segs["teams"][df["home"].to_numpy()] if len(df) else []
+    df["away"] = segs["teams"][df["away"].to_numpy()] if len(df) else []
+    return df
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from player_matrix import team_match_incidence
+
+# naam in de export -> voorwaarde per match (team-perspectief uit team_matches)
+TEAM_STREAKS = {
+    "win": lambda tm: tm["result"] == 1.0,
+    "unbeaten": lambda tm: tm["result"] >= 0.5,
+    "winless": lambda tm: tm["result"] < 1.0,
+    "scored": lambda tm: tm["goals_for"] > 0,
+    "cleanSheet": lambda tm: tm["goals_against"] == 0,
+}
+
+
+# -------------------------------------------------
+# Run-length encoding van booleaanse reeksen, alle entiteiten tegelijk
+# -------------------------------------------------
+def run_length_streaks(codes, flags, n_groups: int):
+    """
+    `codes` (groep per rij) en `flags` (bool per rij), gesorteerd per groep en
+    in chronologische volgorde binnen de groep. Returnt per groep:
+
+    - current: lengte van de lopende reeks True op het einde (0 als de laatste False is)
+    - longest: langste reeks True ooit
+
+    Runs worden gevonden met diff/cumsum: een nieuwe run start waar de vlag
+    of de groep verandert.
+    """
+    codes = np.asarray(codes)
+    flags = np.asarray(flags, dtype=bool)
+    current = np.zeros(n_groups, dtype=int)
+    longest = np.zeros(n_groups, dtype=int)
+    if len(flags) == 0:
+        return current, longest
+
+    start = np.ones(len(flags), dtype=bool)
+    start[1:] = (flags[1:] != flags[:-1]) | (codes[1:] != codes[:-1])
+    run_id = np.cumsum(start) - 1
+
+    run_len = np.bincount(run_id)
+    run_flag = flags[start]
+    run_group = codes[start]
+
+    np.maximum.at(longest, run_group[run_flag], run_len[run_flag])
+
+    # laatste run van elke groep
+    last_run = np.zeros(n_groups, dtype=int) - 1
+    np.maximum.at(last_run, run_group, np.arange(len(run_len)))
+    has = last_run >= 0
+    current[has] = np.where(run_flag[last_run[has]], run_len[last_run[has]], 0)
+    return current, longest
+
+
+def _as_records(keys, names, results) -> dict:
+    """{key: {naam: {"current": c, "longest": l}}}"""
+    return {
+        key: {
+            name: {"current": int(results[name][0][i]), "longest": int(results[name][1][i])}
+            for name in names
+        }
+        for i, key in enumerate(keys)
+    }
+
+
+def team_streaks(tm: pd.DataFrame) -> dict:
+    """Reeksen per ploeg over haar gespeelde matchen (team_matches, gesorteerd per ploeg en datum)."""
+    if tm is None or tm.empty:
+        return {}
+    tm = tm.sort_values(["team", "date", "match_idx"], kind="stable")
+    codes, teams = pd.factorize(tm["team"])
+    results = {
+        name: run_length_streaks(codes, cond(tm).to_numpy(), len(teams))
+        for name, cond in TEAM_STREAKS.items()
+    }
+    return _as_records(list(teams), TEAM_STREAKS, results)
+
+
+def player_streaks(pmx: dict) -> dict:
+    """
+    Reeksen per (ploeg, speler) uit de gedeelde speler × match matrices:
+
+    - scored:  opeenvolgende optredens (minuten > 0) met minstens één goal
+    - started: opeenvolgende matchen van de eigen ploeg in de basis
+               (niet geselecteerd = reeks onderbroken)
+    """
+    M = pmx["M"]
+    n_players = len(pmx["player_team"])
+    if n_players == 0:
+        return {}
+
+    # elke speler × alle matchen van zijn ploeg, chronologisch (kolommen zijn op datum)
+    T = team_match_incidence(pmx)
+    per_team = np.diff(T.indptr)
+    counts = per_team[pmx["player_team"]]
+    rows = np.repeat(np.arange(n_players), counts)
+    starts = T.indptr[pmx["player_team"]]
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cols = T.indices[np.repeat(starts, counts) + offsets]
+
+    def lookup(name):
+        return np.asarray(M[name][rows, cols]).ravel()
+
+    minutes, goals, started = lookup("minutes"), lookup("goals"), lookup("started")
+    appeared = minutes > 0
+
+    results = {
+        "scored": run_length_streaks(rows[appeared], goals[appeared] > 0, n_players),
+        "started": run_length_streaks(rows, started > 0, n_players),
+    }
+    keys = list(zip(pmx["players"]["Team"], pmx["players"]["Player Name"]))
+    return _as_records(keys, ["scored", "started"], results)
@@ -0,0 +1,128 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pipeline_cache import cached
+
+DATA_TEAM_PATH = "data_raw/data_team.csv"
+
+# datums met hoogstens zoveel dagen ertussen horen bij hetzelfde speelblok
+MATCHDAY_GAP_DAYS = 2
+
+
+# -------------------------------------------------
+# Speeldagen uit de kalender
+# -------------------------------------------------
+def fixture_matchdays(dates, home, away) -> np.ndarray:
+    """
+    Speeldag (1-based) per fixture, uit de volledige kalender (gespeeld én
+    toekomstig), 0 voor fixtures zonder datum.
+
+    - fixtures op datum; opeenvolgende datums met hoogstens MATCHDAY_GAP_DAYS
+      ertussen vormen één speelblok (bv. vrijdag–zondag)
+    - een blok met minstens een halve ronde (n_ploegen // 4 fixtures) is een
+      speeldag; kleinere blokken (inhaalmatchen) horen bij de speeldag ervoor
+
+    "Stand na speeldag N" = alle matchen gespeeld vóór speeldag N + 1 begint,
+    ook als een ploeg door een uitgestelde match dan een match minder heeft.
+    """
+    d = pd.to_datetime(pd.Series(np.asarray(dates)), errors="coerce").to_numpy().astype("datetime64[D]")
+    ok = ~np.isnat(d)
+    out = np.zeros(len(d), dtype=int)
+    if not ok.any():
+        return out
+
+    n_teams = len(set(pd.Series(np.asarray(home)).dropna()) | set(pd.Series(np.asarray(away)).dropna()))
+    days, inv = np.unique(d[ok], return_inverse=True)
+    new_block = np.r_[True, np.diff(days).astype(int) > MATCHDAY_GAP_DAYS]
+    block = (np.cumsum(new_block) - 1)[inv.ravel()]
+    is_matchday = np.bincount(block) >= max(n_teams // 4, 1)
+    out[ok] = np.maximum(np.cumsum(is_matchday), 1)[block]
+    return out
+
+
+# -------------------------------------------------
+# Team-perspectief: één rij per (match, ploeg)
+# -------------------------------------------------
+def _interleave(home, away):
+    """[h0, a0, h1, a1, ...] — zelfde volgorde als de vroegere home/away-lus."""
+    return np.stack([np.asarray(home), np.asarray(away)], axis=1).reshape(-1)
+
+
+def stack_sides(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Zet een fixture-tabel (data_team.csv-formaat) om naar twee rijen per match:
+    eerst het thuis-, dan het uitperspectief. Werkt ook voor toekomstige
+    matchen (goals/result/points dan NaN) en voor CSV's zonder ELO-kolommen.
+    'matchday' = speeldag van de fixture (zie fixture_matchdays).
+    """
+    n = len(df)
+    date = pd.to_datetime(df["date"], format="%d/%m/%Y", errors="coerce").to_numpy()
+    hs = pd.to_numeric(df["homeScore"], errors="coerce").to_numpy(dtype=float)
+    as_ = pd.to_numeric(df["awayScore"], errors="coerce").to_numpy(dtype=float)
+
+    def num(col):
+        if col not in df.columns:
+            return np.full(n, np.nan)
+        return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+    elo_hb, elo_ab = num("elo_home_before"), num("elo_away_before")
+    elo_ha, elo_aa = num("elo_home_after"), num("elo_away_after")
+
+    gf = _interleave(hs, as_)
+    ga = _interleave(as_, hs)
+    played = ~np.isnan(gf) & ~np.isnan(ga)
+
+    matchday = fixture_matchdays(date, df["homeTeam"], df["awayTeam"])
+
+    result = np.select([gf > ga, gf == ga], [1.0, 0.5], default=0.0)
+    points = np.select([gf > ga, gf == ga], [3, 1], default=0)
+
+    return pd.DataFrame({
+        "match_idx": np.repeat(np.arange(n), 2),
+        "date": np.repeat(date, 2),
+        "matchday": np.repeat(matchday, 2),
+        "team": _interleave(df["homeTeam"], df["awayTeam"]),
+        "opponent": _interleave(df["awayTeam"], df["homeTeam"]),
+        "is_home": np.tile([1, 0], n),
+        "played": played,
+        "goals_for": gf,
+        "goals_against": ga,
+        "goal_diff": gf - ga,
+        "result": np.where(played, result, np.nan),
+        "points": np.where(played, points, np.nan),
+        "elo_before": _interleave(elo_hb, elo_ab),
+        "elo_after": _interleave(elo_ha, elo_aa),
+        "opp_elo_before": _interleave(elo_ab, elo_hb),
+    })
+
+
+def build_team_matches(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Enkel gespeelde matchen, gesorteerd per ploeg en datum, met
+    'round' = hoeveelste gespeelde match van die ploeg (1-based) en
+    'matchday' = speeldag uit de kalender (zie fixture_matchdays).
+    """
+    tm = stack_sides(df)
+    tm = tm[tm["played"]].drop(columns="played")
+
+    for c in ["goals_for", "goals_against", "goal_diff", "points"]:
+        tm[c] = tm[c].astype(int)
+
+    tm = tm.sort_values(["team", "date", "match_idx"], kind="stable").reset_index(drop=True)
+    tm["round"] = tm.groupby("team").cumcount() + 1
+    return tm
+
+
+def load_team_matches(source: str = DATA_TEAM_PATH) -> pd.DataFrame:
+    """
+    Team-perspectief uit data_team.csv, gememoiseerd (zie pipeline_cache) op de
+    inhoud van de bron en de code van deze module: build_team_stats en de
+    exporters delen zo één opbouw, ook over processen heen.
+    """
+    return cached(
+        "team_matches", [source],
+        lambda: build_team_matches(pd.read_csv(source)),
+        code=[sys.modules[__name__]],
+    ).copy()
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from dutch_dates import parse_dutch_date, parse_dutch_dates
+
+
+def test_parse_dutch_dates_list_input():
+    out = parse_dutch_dates(["ZATERDAG, 30 AUGUSTUS 2025", "zondag, 7 september 2025"])
+    assert list(out) == [pd.Timestamp("2025-08-30"), pd.Timestamp("2025-09-07")]
+    assert list(out.index) == [0, 1]
+
+
+def test_parse_dutch_dates_keeps_series_index():
+    s = pd.Series(["ZATERDAG, 30 AUGUSTUS 2025"] * 2, index=[10, 20])
+    assert list(parse_dutch_dates(s).index) == [10, 20]
+
+
+def test_parse_dutch_date_single_string():
+    assert parse_dutch_date("ZATERDAG, 30 AUGUSTUS 2025") == pd.Timestamp("2025-08-30")
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from ids import intern_players, load_registry, save_registry
+from team_matches import fixture_matchdays
+
+RESULT_CODES = {"Win": "W", "Draw": "D", "Loss": "L"}
+
+# kolom in de export -> (bron, reductie bij dubbele speler-matchrijen)
+TIMELINE_COLS = {
+    "min": ("Minutes Played", np.add),
+    "goals": ("Goals Scored", np.add),
+    "pens": ("Penalties Scored", np.add),
+    "yc": ("Yellow Cards", np.add),
+    "rc": ("red_total", np.add),
+    "start": ("Starting Player", np.maximum),
+    "subIn": ("Substituted In", np.maximum),
+    "subOut": ("Substituted Out", np.maximum),
+}
+
+
+# -------------------------------------------------
+# Plus/minus per speler per match uit de RAPM-segmenten
+# -------------------------------------------------
+def on_pitch_goal_diff(segs: dict | None) -> pd.DataFrame:
+    """
+    Doelpuntensaldo van de eigen ploeg terwijl de speler op het veld stond,
+    per (match, player_id). segs zoals compute_rapm_from_logs(return_segments=True).
+    """
+    if segs is None or not len(segs["seg"]):
+        return pd.DataFrame({"match": [], "player_id": [], "pm": []})
+
+    seg = segs["seg"]
+    counts = np.diff(segs["lineup_ptr"])
+    bucket = np.repeat(np.arange(2 * len(seg)), counts)     # 2k = thuis, 2k+1 = uit
+    k = bucket // 2
+    sign = np.where(bucket % 2 == 0, 1.0, -1.0)
+    on = pd.DataFrame({
+        "match": segs["matches"][seg["match"][k]],
+        "player_id": segs["lineup"],
+        "pm": sign * seg["gd_delta"][k],
+    })
+    return on.groupby(["match", "player_id"], as_index=False, sort=False)["pm"].sum()
+
+
+# -------------------------------------------------
+# Tijdlijn per speler: één sortering, daarna splitsen op offsets
+# -------------------------------------------------
+def build_player_timeline(pm: pd.DataFrame, cal: pd.DataFrame, segs: dict | None = None) -> dict:
+    """
+    Match-per-match reeksen per (ploeg, speler), chronologisch.
+
+    player_matchdata wordt één keer gesorteerd op (ploeg, speler, datum, match);
+    dubbele speler-matchrijen worden via reduceat samengevoegd en de grenzen
+    tussen spelers/ploegen zijn offsets in die ene gesorteerde tabel.
+
+    Returnt {ploeg: {"matches": {...}, "players": [...], "offsets": [...], <kolom>: [...]}}
+    met de rijen van speler i in [offsets[i], offsets[i + 1]) en "m" als index
+    in de matchtabel van de ploeg (datum, speeldag, tegenstander, thuis, uitslag).
+    Speeldag zoals team_matches.fixture_matchdays op de kalender (0 = onbekend).
+    """
+    keep = pm["Team"].fillna("").astype(bool) & pm["Player Name"].fillna("").astype(bool)
+    rows = pm.loc[keep, ["Match URL", "Home Team", "Away Team", "Team", "Player Name", "Match Result",
+                         *[src for src, _ in TIMELINE_COLS.values() if src != "red_total"],
+                         "Red Cards", "YellowRed Cards"]].reset_index(drop=True)
+    rows["red_total"] = rows["Red Cards"].fillna(0) + rows["YellowRed Cards"].fillna(0)
+
+    cal = cal.drop_duplicates("url")
+    dates = pd.to_datetime(rows["Match URL"].map(cal.set_index("url")["date"]))
+    matchday = pd.Series(fixture_matchdays(cal["date"], cal["homeTeam"], cal["awayTeam"]),
+                         index=cal["url"].to_numpy())
+    missing = dates.isna().to_numpy()
+    stamp = dates.fillna(pd.Timestamp(0)).to_numpy().astype("int64")
+    url_codes, urls = pd.factorize(rows["Match URL"])
+    pair_codes, pairs = pd.MultiIndex.from_arrays([rows["Team"], rows["Player Name"]]).factorize(sort=True)
+
+    # de enige sortering: speler (ploeg, naam), dan chronologisch (zonder datum achteraan)
+    order = np.lexsort((url_codes, stamp, missing, pair_codes))
+    pair_s, url_s = pair_codes[order], url_codes[order]
+
+    # één rij per (speler, match)
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (pair_s[1:] != pair_s[:-1]) | (url_s[1:] != url_s[:-1])
+    starts = np.flatnonzero(first)
+    head = order[starts]
+
+    cols = {}
+    for name, (src, ufunc) in TIMELINE_COLS.items():
+        vals = rows[src].fillna(0).to_numpy(dtype=float)[order]
+        cols[name] = ufunc.reduceat(vals, starts) if len(starts) else vals[:0]
+
+    reg = load_registry()
+    pid = intern_players(reg, pairs.get_level_values(0), pairs.get_level_values(1))
+    save_registry(reg)
+
+    # plus/minus: 0 als de speler niet in een segment stond, None als de match geen segmenten heeft
+    pm_gd = np.full(len(head), np.nan)
+    if segs is not None and len(segs["seg"]):
+        on = on_pitch_goal_diff(segs).set_index(["match", "player_id"])["pm"]
+        head_urls = urls[url_codes[head]]
+        key = pd.MultiIndex.from_arrays([head_urls, pid[pair_codes[head]]])
+        pm_gd = on.reindex(key).to_numpy(dtype=float)
+        has_segments = pd.Index(head_urls).isin(segs["matches"][np.unique(segs["seg"]["match"])])
+        pm_gd = np.where(np.isnan(pm_gd) & has_segments, 0.0, pm_gd)
+
+    # grenzen tussen spelers en tussen ploegen in de ontdubbelde tabel
+    row_pair = pair_s[starts]
+    player_start = np.flatnonzero(np.r_[True, row_pair[1:] != row_pair[:-1]]) if len(row_pair) else np.array([], int)
+    player_end = np.r_[player_start[1:], len(row_pair)]
+    team_of_player = np.asarray(pairs.get_level_values(0), dtype=object)[row_pair[player_start]]
+    teams, team_start = np.unique(team_of_player, return_index=True)   # spelers staan per ploeg gesorteerd
+    team_end = np.r_[team_start[1:], len(team_of_player)]
+
+    out = {}
+    for team, p_lo, p_hi in zip(teams, team_start, team_end):
+        p_idx = np.arange(p_lo, p_hi)
+        lo, hi = player_start[p_lo], player_end[p_hi - 1]
+
+        # matchtabel van de ploeg (chronologisch, zoals de spelerrijen)
+        t_head = head[lo:hi]
+        t_rows = rows.iloc[t_head]
+        t_key = np.lexsort((url_codes[t_head], stamp[t_head], missing[t_head]))
+        _, t_first = np.unique(url_codes[t_head][t_key], return_index=True)
+        t_sel = t_rows.iloc[t_key[np.sort(t_first)]]
+        m_codes = pd.Index(t_sel["Match URL"]).get_indexer(t_rows["Match URL"])
+        is_home = (t_sel["Home Team"] == team).to_numpy()
+        t_dates = dates.iloc[t_sel.index]
+
+        out[team] = {
+            "matches": {
+                "date": [d.strftime("%Y-%m-%d") if pd.notna(d) else None for d in t_dates],
+                "md": t_sel["Match URL"].map(matchday).fillna(0).astype(int).tolist(),
+                "opp": np.where(is_home, t_sel["Away Team"], t_sel["Home Team"]).astype(str).tolist(),
+                "home": is_home.astype(int).tolist(),
+                "res": [RESULT_CODES.get(r) for r in t_sel["Match Result"]],
+            },
+            "players": [pairs[row_pair[player_start[i]]][1] for i in p_idx],
+            "offsets": (np.r_[player_start[p_idx], hi] - lo).tolist(),
+            "m": m_codes.tolist(),
+            **{name: cols[name][lo:hi].astype(int).tolist() for name in TIMELINE_COLS},
+            "pm": [None if np.isnan(v) else int(v) for v in pm_gd[lo:hi]],
+        }
+    return out